@@ -142,6 +142,27 @@ class Ldap(ABC):
     def entries(self) -> Generator[dict, None, None]:
         pass
 
+    def paged_search(
+            self,
+            search_base,
+            search_filter,
+            search_scope,
+            attributes,
+            page_size=1_000
+    ) -> Generator[dict, None, None]:
+        """
+        Search in pages (Simple Paged Results control), yielding entries as pages arrive.
+            Default - A single search, for adaptors without paging.
+        :param search_base:
+        :param search_filter:
+        :param search_scope:
+        :param attributes:
+        :param page_size: Entries per page (Below the server's size limit, e.g. 1000 for Active Directory)
+        :return:
+        """
+        self.search(search_base, search_filter, search_scope, attributes)
+        yield from self.entries()
+
 
 class Ldap3Module(Ldap):
 
@@ -215,6 +236,41 @@ class Ldap3Module(Ldap):
         for entry in self.__connection.entries:
             yield json.loads(entry.entry_to_json())
 
+    def paged_search(
+            self,
+            search_base,
+            search_filter,
+            search_scope,
+            attributes,
+            page_size=1_000
+    ) -> Generator[dict, None, None]:
+
+        connection = self.__connection
+        cookie = None
+
+        while True:
+            connection.search(
+                search_base=search_base,
+                search_filter=search_filter,
+                search_scope=search_scope,
+                attributes=attributes,
+                paged_size=page_size,
+                paged_cookie=cookie
+            )
+
+            yield from self.entries()
+
+            # Simple Paged Results control (RFC 2696)
+            cookie = (
+                connection.result
+                .get('controls', {})
+                .get('1.2.840.113556.1.4.319', {})
+                .get('value', {})
+                .get('cookie')
+            )
+            if not cookie:
+                break
+
 
 class HttpResponse(ABC):
     """
@@ -241,6 +297,19 @@ class HttpResponse(ABC):
     def cookies(self) -> dict:
         pass
 
+    def iter_text(self, chunk_size: int = 65_536) -> Generator[str, None, None]:
+        """
+        Iterate the body text in chunks, as it's received (when requested with `stream=True`).
+            Default - The whole text as a single chunk.
+        """
+        yield self.text()
+
+    def close(self):
+        """
+        Release the connection of a streamed response, if any.
+        """
+        pass
+
 
 class HttpRequest(ABC):
     """
@@ -269,6 +338,12 @@ class HttpRequest(ABC):
     ) -> HttpResponse:
         pass
 
+    def close(self):
+        """
+        Release pooled connections, if any.
+        """
+        pass
+
 
 class RequestsModuleResponse(HttpResponse):
 
@@ -290,6 +365,14 @@ class RequestsModuleResponse(HttpResponse):
     def json(self) -> dict:
         return self.__response.json()
 
+    def iter_text(self, chunk_size: int = 65_536) -> Generator[str, None, None]:
+        if self.__response.encoding is None:
+            self.__response.encoding = 'utf-8'  # JSON's default (Otherwise `requests` yields bytes).
+        return self.__response.iter_content(chunk_size=chunk_size, decode_unicode=True)
+
+    def close(self):
+        self.__response.close()
+
 
 class RequestsModule(HttpRequest):
 
@@ -340,6 +423,285 @@ class RequestsModule(HttpRequest):
         return RequestsModuleResponse(response)
 
 
+class RequestsSessionModule(HttpRequest):
+    """
+    A `requests.Session` based HTTP Request adaptor:
+        Keep-alive connections are reused from a pool (No TCP & TLS handshake per request),
+         failed connections & gateway errors are retried with an exponential backoff.
+
+            import requests
+            adapter = RequestsSessionModule(requests, pool_size=10, retries=3)
+    """
+
+    def __init__(
+            self,
+            module,
+            pool_size=10,
+            retries=3,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            pool_block=False
+    ):
+        """
+        :param module: The `requests` module
+        :param pool_size: Connections kept alive per host
+        :param retries: Retries of a failed request. Non idempotent requests (e.g. POST) are only retried
+         when the connection failed, before the request was sent.
+        :param backoff_factor: Retries backoff - {backoff factor} * (2 ** ({retry number} - 1)) seconds
+        :param status_forcelist: Response status codes to retry
+        :param pool_block: Wait for a free connection when all of the pool's connections are in use
+        """
+        if module.__name__ != 'requests':
+            raise Exception("Expected `requests` module.")
+
+        retry = module.adapters.Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=status_forcelist,
+            raise_on_status=False
+        )
+
+        http_adapter = module.adapters.HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+            pool_block=pool_block
+        )
+
+        self.__session = module.Session()
+        self.__session.mount('https://', http_adapter)
+        self.__session.mount('http://', http_adapter)
+
+    def request(
+            self,
+            method,
+            url,
+            params=None,
+            data=None,
+            headers=None,
+            cookies=None,
+            files=None,
+            auth=None,
+            timeout=None,
+            allow_redirects=True,
+            proxies=None,
+            hooks=None,
+            stream=None,
+            verify=None,
+            cert=None,
+            json=None
+    ) -> HttpResponse:
+        response = self.__session.request(
+            method,
+            url,
+            params=params,
+            data=data,
+            headers=headers,
+            cookies=cookies,
+            files=files,
+            auth=auth,
+            timeout=timeout,
+            allow_redirects=allow_redirects,
+            proxies=proxies,
+            hooks=hooks,
+            stream=stream,
+            verify=verify,
+            cert=cert,
+            json=json
+        )
+        return RequestsModuleResponse(response)
+
+    def close(self):
+        self.__session.close()
+
+
+class BufferedHttpResponse(HttpResponse):
+    """
+    A response which body was already read, e.g. of an async HTTP Request adaptor.
+    """
+
+    def __init__(self, status_code: int, body: bytes, headers: dict = None, cookies: dict = None, encoding='utf-8'):
+        self.__status_code = status_code
+        self.__body = body
+        self.__headers = headers if headers is not None else {}
+        self.__cookies = cookies if cookies is not None else {}
+        self.__encoding = encoding
+
+    def status_code(self) -> int:
+        return self.__status_code
+
+    def content(self) -> bytes:
+        return self.__body
+
+    def text(self) -> str:
+        return self.__body.decode(self.__encoding, errors='replace')
+
+    def headers(self) -> dict:
+        return self.__headers
+
+    def cookies(self) -> dict:
+        return self.__cookies
+
+    def json(self) -> dict:
+        return json.loads(self.__body)
+
+
+class AsyncHttpRequest(ABC):
+    """
+    The async counterpart of `HttpRequest`, with the same `request` signature.
+    """
+
+    @abstractmethod
+    async def request(
+            self,
+            method,
+            url,
+            params=None,
+            data=None,
+            headers=None,
+            cookies=None,
+            files=None,
+            auth=None,
+            timeout=None,
+            allow_redirects=True,
+            proxies=None,
+            hooks=None,
+            stream=None,
+            verify=None,
+            cert=None,
+            json=None
+    ) -> HttpResponse:
+        pass
+
+    async def close(self):
+        """
+        Release pooled connections, if any.
+        """
+        pass
+
+
+class AiohttpModule(AsyncHttpRequest):
+    """
+    An `aiohttp` based async HTTP Request adaptor. Responses are read completely (`BufferedHttpResponse`).
+
+        import aiohttp
+        adapter = AiohttpModule(aiohttp, pool_size=10)
+
+    The client session is created by the first request, within the running event loop.
+    """
+
+    # pip install aiohttp
+    def __init__(self, module, pool_size=10):
+        """
+        :param module: The `aiohttp` module
+        :param pool_size: Concurrent connections per host
+        """
+        if module.__name__ != 'aiohttp':
+            raise Exception("Expected `aiohttp` module.")
+
+        self.__module = module
+        self.__pool_size = pool_size
+        self.__session = None
+        self.__ssl_contexts = {}
+
+    def __ssl(self, verify, cert):
+
+        if verify is None:
+            verify = True
+
+        if cert is None and verify is True:
+            return True  # aiohttp's default verification
+
+        key = (verify, cert if isinstance(cert, str) else tuple(cert or ()))
+        if key not in self.__ssl_contexts:
+            import ssl
+
+            if verify is False:
+                context = ssl.create_default_context()
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            elif isinstance(verify, str):
+                context = ssl.create_default_context(cafile=verify)
+            else:
+                context = ssl.create_default_context()
+
+            if isinstance(cert, str):
+                context.load_cert_chain(cert)
+            elif cert:
+                context.load_cert_chain(*cert)
+
+            self.__ssl_contexts[key] = context
+
+        return self.__ssl_contexts[key]
+
+    async def request(
+            self,
+            method,
+            url,
+            params=None,
+            data=None,
+            headers=None,
+            cookies=None,
+            files=None,
+            auth=None,
+            timeout=None,
+            allow_redirects=True,
+            proxies=None,
+            hooks=None,
+            stream=None,
+            verify=None,
+            cert=None,
+            json=None
+    ) -> HttpResponse:
+        aiohttp = self.__module
+
+        if files is not None or hooks is not None:
+            raise Exception("`files` & `hooks` are not supported by the `aiohttp` adaptor.")
+
+        if self.__session is None:
+            self.__session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.__pool_size)
+            )
+
+        proxy = None
+        if proxies:
+            proxy = proxies.get(url.split(':', 1)[0])
+
+        if isinstance(auth, tuple):
+            auth = aiohttp.BasicAuth(*auth)
+
+        if isinstance(timeout, (int, float)):
+            timeout = aiohttp.ClientTimeout(total=timeout)
+
+        async with self.__session.request(
+            method,
+            url,
+            params=params,
+            data=data,
+            headers=headers,
+            cookies=cookies,
+            auth=auth,
+            timeout=timeout,
+            allow_redirects=allow_redirects,
+            proxy=proxy,
+            ssl=self.__ssl(verify, cert),
+            json=json
+        ) as response:
+            body = await response.read()
+            return BufferedHttpResponse(
+                response.status,
+                body,
+                headers=dict(response.headers),
+                cookies={name: morsel.value for name, morsel in response.cookies.items()},
+                encoding=response.get_encoding() if body else 'utf-8'
+            )
+
+    async def close(self):
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+
 class ArcSightEsm(ABC):
 
     def __init__(
@@ -12,18 +12,36 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+from typing import Awaitable
+from typing import Callable
+from typing import Generator
 from typing import Union
+from typing import Tuple
 from collections.abc import Iterable
 
-import urllib3
-import requests
+import hashlib
+import json
+import os
+import sys
+import threading
 import zlib
+from copy import deepcopy
+from enum import Enum
+from functools import lru_cache
+from itertools import chain
+from time import monotonic
+from time import sleep
 
 from siemkit.api.arcsight.esm import ArcSightUri
 from siemkit.api.arcsight.esm import ArcSightUriEnum
+from siemkit.adaptors import AiohttpModule
+from siemkit.adaptors import AsyncHttpRequest
+from siemkit.adaptors import HttpRequest
 from siemkit.adaptors import RequestsModule
+from siemkit.adaptors import RequestsSessionModule
 from siemkit.adaptors import HttpResponse
 
+from siemkit.data import JsonStream
 from siemkit.data import RamKeyring
 from siemkit.data import Vault
 
@@ -31,13 +49,1926 @@ from siemkit.api.arcsight.esm.v72.auth import LoginApiEnum
 from siemkit.api.arcsight.esm.v72.activelist import ActiveListApiEnum
 from siemkit.api.arcsight.esm.v72.events import EventsApiEnum
 
-http_request_module = RequestsModule(requests)
-urllib3.disable_warnings()
 
+@lru_cache(maxsize=1)
+def default_http_request_module() -> HttpRequest:
+    """
+    The default HTTP adaptor. `requests` & `urllib3` are imported on the first request, not with `siemkit.arcsight`.
+    """
+    import urllib3
+    import requests
+
+    urllib3.disable_warnings()
+    return RequestsModule(requests)
+
+
+def session_http_request_module(pool_size=10, retries=3) -> HttpRequest:
+    """
+    A pooled, keep-alive HTTP adaptor (See `siemkit.adaptors.RequestsSessionModule`).
+    """
+    import urllib3
+    import requests
+
+    urllib3.disable_warnings()
+    return RequestsSessionModule(requests, pool_size=pool_size, retries=retries)
+
+
+def __getattr__(name):
+    # Backward compatibility - `http_request_module` used to be created on import.
+    if name == 'http_request_module':
+        return default_http_request_module()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def request_args(
+        url_base: str,
+        api: Union[ArcSightUri, ArcSightUriEnum],
+        variables: dict,
+        verify=True,
+        cert=None,
+        proxies: dict = None
+) -> dict:
+    """
+    Build the HTTP Request adaptor arguments of an API call (Shared by `Esm` & `AsyncEsm`).
+    :param url_base: e.g. https://esm.example.com:8443
+    :param api:
+    :param variables: API variables, including the token.
+    :param verify:
+    :param cert:
+    :param proxies:
+    :return:
+    """
+    if isinstance(api, ArcSightUriEnum):
+        api = api.value
+
+    uri, args = api.args(variables=variables)
+
+    args.update(
+        {
+            'url': f"{url_base}{uri}",
+            'verify': verify,
+            'cert': cert,
+            'proxies': proxies
+        }
+    )
+
+    return args
+
+
+def unpack_event_ids(event_ids) -> Generator[int, None, None]:
+    for event_id in event_ids:
+        if isinstance(event_id, int):
+            yield event_id
+        elif isinstance(event_id, str):
+            yield int(event_id)
+        elif isinstance(event_id, Iterable):
+            for id_ in event_id:
+                yield int(id_)
+
+
+def login_token(response: HttpResponse) -> Union[str, None]:
+    if response.status_code() == 200:
+        return (
+            response.json()
+                .get('log.loginResponse', {})
+                .get('log.return', '')
+        )
+
+
+def auth_failed(response: HttpResponse) -> bool:
+    """
+    Whether a response was rejected for its token (expired or invalid).
+        ESM answers 401, or 500 with a security exception.
+    """
+    status_code = response.status_code()
+
+    if status_code == 401:
+        return True
+
+    if status_code == 500:
+        text = response.text().lower()
+        return 'securityexception' in text or 'authtoken' in text or 'authentication' in text
+
+    return False
+
+
+class TokenManager:
+    """
+    The lifecycle of an ESM auth token, shared by the threads using an `Esm`:
+        - Logs in lazily, on the first `token()`.
+        - Refreshes proactively once the token is `max_age` seconds old, and logs out the replaced token.
+        - Refreshes once under concurrency (single-flight): threads which failed with the same stale token
+          wait for a single login, and use its token.
+    """
+
+    def __init__(
+            self,
+            login: Callable[[], Union[str, None]],
+            max_age: float = 1_200,
+            logout: Callable[[str], object] = None
+    ):
+        """
+        :param login: Log in & return the new token, None on failure.
+        :param max_age: Seconds after which the token is refreshed before use. None - Only on auth failures.
+        :param logout: Log out a token replaced by a new login (Errors are ignored). None - Replaced tokens expire.
+        """
+        self.__login = login
+        self.__logout = logout
+        self.__max_age = max_age
+        self.__lock = threading.Lock()
+        self.__token = None
+        self.__issued = 0.0
+        self.__logins = 0
+
+    def peek(self) -> Tuple[Union[str, None], bool]:
+        """
+        :return: The current token & whether it must be refreshed before use (Missing or too old).
+        """
+        token, issued = self.__token, self.__issued
+        expired = token is None or (self.__max_age is not None and monotonic() - issued >= self.__max_age)
+        return token, expired
+
+    def replaced(self, stale_token) -> bool:
+        """
+        :return: Whether the token is no longer `stale_token` (Another caller already refreshed it).
+        """
+        return self.__token != stale_token
+
+    def issue(self, token: Union[str, None]) -> Union[str, None]:
+        """
+        Keep the token of a login (None - The login failed).
+        :return: The current token
+        """
+        self.__logins += 1
+
+        if token:
+            self.__token = token
+            self.__issued = monotonic()
+        else:
+            self.__token = None
+
+        return self.__token
+
+    def token(self) -> Union[str, None]:
+        """
+        :return: A valid token, logging in if there's none or it's too old.
+        """
+        token, expired = self.peek()
+
+        if expired:
+            return self.refresh(stale_token=token)
+
+        return token
+
+    def refresh(self, stale_token=None, force=False, rejected=False) -> Union[str, None]:
+        """
+        Log in, unless another thread already replaced `stale_token`.
+        :param stale_token: The rejected (or expired) token, None if there was none.
+        :param force: Log in anyway.
+        :param rejected: The manager rejected `stale_token`, it's not logged out.
+        :return: The current token
+        """
+        with self.__lock:
+            if not force and self.replaced(stale_token):
+                return self.__token
+
+            replaced_token = None if rejected else self.__token
+            token = self.issue(self.__login())
+
+        if token and replaced_token:
+            self.retire(replaced_token)
+
+        return token
+
+    def retire(self, token: str):
+        """
+        Log out a replaced token, ignoring errors (It expires on the manager regardless).
+        """
+        if self.__logout is None:
+            return
+
+        try:
+            self.__logout(token)
+        except Exception:
+            pass
+
+    def invalidate(self):
+        with self.__lock:
+            self.__token = None
+
+    def age(self) -> Union[float, None]:
+        """
+        :return: Seconds since the token was issued, None without a token.
+        """
+        return None if self.__token is None else monotonic() - self.__issued
+
+    def logins(self) -> int:
+        """
+        :return: Amount of logins so far.
+        """
+        return self.__logins
+
+    def __bool__(self):
+        return self.__token is not None
+
+
+class AsyncTokenManager(TokenManager):
+    """
+    The `TokenManager` lifecycle for the tasks using an `AsyncEsm`, with an async login.
+        `token()` & `refresh()` are coroutines, concurrent refreshes wait for a single login.
+    """
+
+    def __init__(
+            self,
+            login: Callable[[], Awaitable[Union[str, None]]],
+            max_age: float = 1_200,
+            logout: Callable[[str], Awaitable] = None
+    ):
+        """
+        :param login: A coroutine function logging in & returning the new token, None on failure.
+        :param max_age: Seconds after which the token is refreshed before use. None - Only on auth failures.
+        :param logout: A coroutine function logging out a token replaced by a new login (Errors are ignored).
+        """
+        super().__init__(login=None, max_age=max_age)
+        self.__login = login
+        self.__logout = logout
+        self.__lock = None  # Created on use, within the running event loop.
+
+    async def token(self) -> Union[str, None]:
+        token, expired = self.peek()
+
+        if expired:
+            return await self.refresh(stale_token=token)
+
+        return token
+
+    async def refresh(self, stale_token=None, force=False, rejected=False) -> Union[str, None]:
+        import asyncio  # Imported on use, as `siemkit.arcsight` is mostly used synchronously.
+
+        if self.__lock is None:
+            self.__lock = asyncio.Lock()
+
+        async with self.__lock:
+            current_token = self.peek()[0]
+            if not force and self.replaced(stale_token):
+                return current_token
+
+            replaced_token = None if rejected else current_token
+            token = self.issue(await self.__login())
+
+        if token and replaced_token:
+            await self.retire(replaced_token)
+
+        return token
+
+    async def retire(self, token: str):
+        if self.__logout is None:
+            return
+
+        try:
+            await self.__logout(token)
+        except Exception:
+            pass
+
+
+def security_events(response: HttpResponse, event_ids, stream=False) -> Generator[dict, None, None]:
+    """
+    The simplified events of a `getSecurityEvents` response.
+    :param response:
+    :param event_ids: The requested event IDs (For errors)
+    :param stream: Decode the events incrementally, as the response is received (See `simplified_cef_events()`)
+    :return:
+    """
+    if response.status_code() != 200:
+        raise Exception(f"(Response {response.status_code()}) "
+                        f"Could not retrieve event IDs '{', '.join(str(event_id) for event_id in event_ids)}'.")
+
+    if stream:
+
+        def streamed_events():
+            found = False
+            for event in simplified_cef_events(response, stream=True):
+                found = True
+                yield event
+
+            if not found:
+                raise Exception(f"Event IDs '{', '.join(str(event_id) for event_id in event_ids)}' were not found.")
+
+        return streamed_events()
+
+    sev_get_security_events_response = response.json().get('sev.getSecurityEventsResponse') or {}
+
+    if 'sev.return' not in sev_get_security_events_response:
+        raise Exception(f"Event IDs '{', '.join(str(event_id) for event_id in event_ids)}' were not found.")
+
+    return simplified_cef_events(response)
+
+
+def entries_columns(entries) -> Union[list, None]:
+    """
+    The columns of active list entries (`_columns_order` of normalized entries), or None.
+    """
+    if isinstance(entries, dict):
+        return entries.get('_columns_order')
+    elif not isinstance(entries, str) and hasattr(entries, '__getitem__'):
+        return entries[0].get('_columns_order')
+    else:
+        raise TypeError(f"Illegal entries object: {entries}")
+
+
+def chunk_entries(entries, columns, chunk_size=1_000, max_bytes=1_048_576) -> Generator[Tuple[list, int], None, None]:
+    """
+    Split active list entries into chunks of up to `chunk_size` entries & about `max_bytes` of JSON.
+        Entries are consumed lazily, a generator of entries is never materialized.
+    :param entries: Iterable of entries (dict)
+    :param columns: The written columns
+    :param chunk_size: Maximum entries per chunk
+    :param max_bytes: Maximum estimated JSON bytes per chunk (A larger single entry gets its own chunk)
+    :return: Generator of (chunk, estimated JSON bytes)
+    """
+    chunk = []
+    chunk_bytes = 0
+
+    for entry in entries:
+        # {"entry": [...]},
+        entry_bytes = len(json.dumps([entry[column] for column in columns])) + 12
+
+        if chunk and (len(chunk) >= chunk_size or chunk_bytes + entry_bytes > max_bytes):
+            yield chunk, chunk_bytes
+            chunk = []
+            chunk_bytes = 0
+
+        chunk.append(entry)
+        chunk_bytes += entry_bytes
+
+    if chunk:
+        yield chunk, chunk_bytes
+
+
+def activelist_fields(attributes: dict) -> dict:
+
+    result = {}
+
+    for index, field in enumerate(attributes['fieldNames']):
+        result[field] = {
+            'key': attributes['keyFields'][index],
+            'type': attributes['fieldTypes'][index]
+        }
+
+    return result
+
+
+class ActiveListMetadataCache:
+    """
+    A thread-safe cache of active list attributes (`findByUUID`), per resource ID, expiring after `ttl` seconds.
+        Spares the metadata request of every write (`Esm.add_activelist_entries()` without `_columns_order`).
+         May be shared by several `Esm` objects of the same ESM.
+        Attributes are copied in & out, mutating them never changes the cache.
+    """
+
+    def __init__(self, ttl: float = 300):
+        """
+        :param ttl: Seconds to keep attributes. None - Until invalidated.
+        """
+        self.__ttl = ttl
+        self.__attributes = {}  # {resource_id: (expiry, attributes)}
+        self.__lock = threading.Lock()
+
+    def get(self, resource_id) -> Union[dict, None]:
+        """
+        :param resource_id:
+        :return: The cached attributes, None when missing or expired.
+        """
+        with self.__lock:
+            cached = self.__attributes.get(resource_id)
+
+            if cached is None:
+                return None
+
+            expiry, attributes = cached
+            if expiry is not None and monotonic() >= expiry:
+                del self.__attributes[resource_id]
+                return None
+
+        return deepcopy(attributes)
+
+    def set(self, resource_id, attributes: dict):
+        expiry = None if self.__ttl is None else monotonic() + self.__ttl
+        attributes = deepcopy(attributes)
+
+        with self.__lock:
+            self.__attributes[resource_id] = (expiry, attributes)
+
+    def invalidate(self, resource_id=None):
+        """
+        :param resource_id: None - Invalidate all resources.
+        """
+        with self.__lock:
+            if resource_id is None:
+                self.__attributes.clear()
+            else:
+                self.__attributes.pop(resource_id, None)
+
+    def __len__(self):
+        return len(self.__attributes)
+
+
+# The requests & responses of `Esm` & `AsyncEsm`. Requests are (api, variables) - `uri()` adds the token.
+
+def security_events_request(event_ids: list, start_millis='-1', end_millis='-1') -> Tuple[ArcSightUriEnum, dict]:
+    return EventsApiEnum.GET_SECURITY_EVENTS, {
+        'event_ids': event_ids,
+        'start_millis': start_millis,
+        'end_millis': end_millis
+    }
+
+
+def activelist_attributes_request(resource_id) -> Tuple[ArcSightUriEnum, dict]:
+    return ActiveListApiEnum.FIND_BY_UUID, {
+        'uuid': resource_id
+    }
+
+
+def activelist_attributes_response(response: HttpResponse, resource_id) -> dict:
+    """
+    :return: The attributes of a `findByUUID` response
+    """
+    if response.status_code() != 200:
+        raise Exception(f"(Response {response.status_code()}) "
+                        f"Could not retrieve resource ID '{resource_id}'.")
+
+    return response.json()['act.findByUUIDResponse']['act.return']
+
+
+def activelist_entries_request(resource_id) -> Tuple[ArcSightUriEnum, dict]:
+    return ActiveListApiEnum.GET_ENTRIES, {
+        'resource_id': resource_id
+    }
+
+
+def check_activelist_entries_response(response: HttpResponse, resource_id):
+    """
+    Raise (& close the response) unless a `getEntries` response succeeded.
+    """
+    if response.status_code() != 200:
+        response.close()
+        raise Exception(f"(Response {response.status_code()}) "
+                        f"Could not retrieve resource ID '{resource_id}'.")
+
+
+def write_entries_request(resource_id, columns, entries, delete=False) -> Tuple[ArcSightUriEnum, dict]:
+    return ActiveListApiEnum.DELETE_ENTRIES if delete else ActiveListApiEnum.ADD_ENTRIES, {
+        'resource_id': resource_id,
+        'columns': columns,
+        'entries': entries
+    }
+
+
+def check_write_entries_response(
+        response: HttpResponse,
+        resource_id,
+        delete=False,
+        metadata_cache: ActiveListMetadataCache = None
+):
+    """
+    Raise unless an `addEntries` / `deleteEntries` response succeeded.
+        A failed write invalidates the active list's cached attributes - its columns may have changed.
+    """
+    if response.status_code() != 204:
+        if metadata_cache is not None:
+            metadata_cache.invalidate(resource_id)
+
+        if delete:
+            raise Exception(f"(Response {response.status_code()}) "
+                            f"Could not delete entries of resource ID '{resource_id}'.")
+
+        raise Exception(f"(Response {response.status_code()}) "
+                        f"Could not add entries to resource ID '{resource_id}'.")
+
+
+class EventCache:
+    """
+    A persistent (SQLite) cache of retrieved events by event ID, evicting the least recently used events.
+        Used by `retrieve_event_ids()` before any request - cached events are served locally,
+         e.g. when re-pulling the same correlation trees across investigations.
+
+        e.g.
+            with EventCache('cache/events.db', max_events=1_000_000, max_bytes=1_073_741_824) as event_cache:
+                esm = Esm(server, port, username, password, event_cache=event_cache)
+
+    Thread-safe, a single connection is shared behind a lock.
+    """
+
+    BATCH_SIZE = 500  # Event IDs per SQL statement (SQLite limits statement variables).
+
+    def __init__(self, path: str, max_events: int = 100_000, max_bytes: int = None):
+        """
+        :param path: Database file path. ':memory:' - Not persistent.
+        :param max_events: Maximum amount of cached events. None - Unlimited.
+        :param max_bytes: Maximum total JSON size of the cached events. None - Unlimited.
+        """
+        import sqlite3  # Imported on use
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self.__max_events = max_events
+        self.__max_bytes = max_bytes
+        self.__lock = threading.Lock()
+
+        self.__connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute('PRAGMA synchronous=NORMAL')
+        self.__connection.execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            'event_id INTEGER PRIMARY KEY, event TEXT NOT NULL, size INTEGER NOT NULL, accessed INTEGER NOT NULL)'
+        )
+        self.__connection.execute('CREATE INDEX IF NOT EXISTS events_accessed ON events (accessed)')
+
+        self.__events, self.__bytes, self.__clock = self.__connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(MAX(accessed), 0) FROM events'
+        ).fetchone()
+
+    def __tick(self) -> int:
+        self.__clock += 1
+        return self.__clock
+
+    def __batches(self, event_ids):
+        event_ids = list(event_ids)
+        for index in range(0, len(event_ids), self.BATCH_SIZE):
+            yield event_ids[index:index + self.BATCH_SIZE]
+
+    def get_many(self, event_ids) -> dict:
+        """
+        :param event_ids:
+        :return: The cached events by event ID, marked as recently used.
+        """
+        events = {}
+
+        with self.__lock:
+            accessed = self.__tick()
+
+            for batch in self.__batches(event_ids):
+                variables = ', '.join('?' * len(batch))
+                rows = self.__connection.execute(
+                    f'SELECT event_id, event FROM events WHERE event_id IN ({variables})', batch
+                ).fetchall()
+
+                if not rows:
+                    continue
+
+                for event_id, event in rows:
+                    events[event_id] = json.loads(event)
+
+                self.__connection.execute(
+                    f'UPDATE events SET accessed = ? WHERE event_id IN ({", ".join("?" * len(rows))})',
+                    [accessed] + [event_id for event_id, _ in rows]
+                )
+
+        return events
+
+    def put_many(self, events):
+        """
+        Cache events (by their `eventId`) & evict the least recently used events beyond the limits.
+        :param events: Iterable of events (dict)
+        """
+        rows = {}
+        for event in events:
+            event_id = event.get('eventId')
+            if event_id is None:
+                continue
+            event_json = json.dumps(event)
+            rows[int(event_id)] = (event_json, len(event_json))
+
+        if not rows:
+            return
+
+        with self.__lock:
+            accessed = self.__tick()
+
+            self.__connection.execute('BEGIN')
+            try:
+                for batch in self.__batches(rows):
+                    replaced = self.__connection.execute(
+                        f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM events '
+                        f'WHERE event_id IN ({", ".join("?" * len(batch))})', batch
+                    ).fetchone()
+
+                    self.__connection.executemany(
+                        'INSERT OR REPLACE INTO events (event_id, event, size, accessed) VALUES (?, ?, ?, ?)',
+                        ((event_id, rows[event_id][0], rows[event_id][1], accessed) for event_id in batch)
+                    )
+
+                    self.__events += len(batch) - replaced[0]
+                    self.__bytes += sum(rows[event_id][1] for event_id in batch) - replaced[1]
+
+                self.__evict()
+                self.__connection.execute('COMMIT')
+            except BaseException:
+                self.__connection.execute('ROLLBACK')
+                self.__events, self.__bytes = self.__connection.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM events'
+                ).fetchone()
+                raise
+
+    def __evict(self):
+
+        while (
+                (self.__max_events is not None and self.__events > self.__max_events) or
+                (self.__max_bytes is not None and self.__bytes > self.__max_bytes)
+        ):
+            excess = self.__events - self.__max_events if self.__max_events is not None else 0
+            rows = self.__connection.execute(
+                'SELECT event_id, size FROM events ORDER BY accessed LIMIT ?', (max(excess, self.BATCH_SIZE // 10),)
+            ).fetchall()
+
+            if not rows:
+                break
+
+            evicted = []
+            for event_id, size in rows:
+                if not (
+                        (self.__max_events is not None and self.__events > self.__max_events) or
+                        (self.__max_bytes is not None and self.__bytes > self.__max_bytes)
+                ):
+                    break
+                evicted.append(event_id)
+                self.__events -= 1
+                self.__bytes -= size
+
+            for batch in self.__batches(evicted):
+                self.__connection.execute(
+                    f'DELETE FROM events WHERE event_id IN ({", ".join("?" * len(batch))})', batch
+                )
+
+    def __contains__(self, event_id):
+        with self.__lock:
+            return self.__connection.execute(
+                'SELECT 1 FROM events WHERE event_id = ?', (int(event_id),)
+            ).fetchone() is not None
+
+    def __getitem__(self, event_id) -> dict:
+        event = self.get_many((int(event_id),)).get(int(event_id))
+        if event is None:
+            raise KeyError(event_id)
+        return event
+
+    def __setitem__(self, event_id, event: dict):
+        self.put_many((dict(event, eventId=event_id),))
+
+    def get(self, event_id, default=None):
+        return self.get_many((int(event_id),)).get(int(event_id), default)
+
+    def __len__(self):
+        return self.__events
+
+    def size(self) -> int:
+        """
+        :return: The total JSON size of the cached events.
+        """
+        return self.__bytes
+
+    def clear(self):
+        with self.__lock:
+            self.__connection.execute('DELETE FROM events')
+            self.__events = 0
+            self.__bytes = 0
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class EventIdsExpansion:
+    """
+    The breadth-first expansion of `retrieve_event_ids()` (Shared by `Esm` & `AsyncEsm`):
+        Each level holds the event IDs which are neither cached nor requested yet.
+         Retrieved events are cached, filtered by type & limit, and their base event IDs form the next level.
+    """
+
+    def __init__(
+            self,
+            event_ids,
+            correlation=True,
+            aggregated=True,
+            base=True,
+            action=True,
+            sub_events=False,
+            events_cache=None,
+            deduplicate=True,
+            limit=-1
+    ):
+        if events_cache is None:
+            events_cache = {}
+
+        self.__events_cache = events_cache
+        self.__sub_events = sub_events
+        self.__deduplicate = deduplicate
+        self.__limit = limit
+
+        self.__retrieve_types = set()
+
+        if correlation:
+            self.__retrieve_types.add('CORRELATION')
+        if aggregated:
+            self.__retrieve_types.add('AGGREGATED')
+        if base:
+            self.__retrieve_types.add('BASE')
+        if action:
+            self.__retrieve_types.add('ACTION')
+
+        # New events to retrieve
+        self.__level = [event_id for event_id in unpack_event_ids(event_ids) if event_id not in events_cache]
+        if deduplicate:
+            self.__level = list(dict.fromkeys(self.__level))
+        self.__requested = set(self.__level)
+        self.__cache_checked = set()
+
+    def done(self) -> bool:
+        return self.__limit == 0
+
+    def cached(self, event_cache: EventCache) -> list:
+        """
+        Take the current level's event IDs which are found in a persistent cache (Each ID is looked up once).
+        :return: The cached events, to accept instead of retrieving them.
+        """
+        unchecked = [event_id for event_id in self.__level if event_id not in self.__cache_checked]
+        if not unchecked:
+            return []
+
+        self.__cache_checked.update(unchecked)
+
+        events = event_cache.get_many(unchecked)
+        if events:
+            self.__level = [event_id for event_id in self.__level if event_id not in events]
+
+        return [events[event_id] for event_id in unchecked if event_id in events]
+
+    def chunks(self, chunk_size: int) -> list:
+        """
+        Take the current level's event IDs, in chunks. Empty when the expansion is done.
+        """
+        level, self.__level = self.__level, []
+
+        if self.done():
+            return []
+
+        return [level[index:index + chunk_size] for index in range(0, len(level), chunk_size)]
+
+    def accept(self, events) -> Generator[dict, None, None]:
+        """
+        Process retrieved events.
+        :param events:
+        :return: The events to yield
+        """
+        events_cache = self.__events_cache
+
+        for event in events:
+
+            if self.done():
+                return
+
+            event_id = event.get('eventId')
+            event_type = event.get('type')
+
+            if event_id in events_cache:
+                if self.__deduplicate:
+                    continue
+            events_cache[event_id] = event  # Store in cache
+
+            if event_type is None:
+                continue
+
+            if event_type in self.__retrieve_types:
+                yield event
+                self.__limit -= 1
+
+            if self.__sub_events:
+                for base_event_id in unpack_event_ids((event.get('baseEventIds') or (),)):
+                    if base_event_id not in events_cache and base_event_id not in self.__requested:
+                        self.__requested.add(base_event_id)
+                        self.__level.append(base_event_id)
+
+
+# ToDo: Separate event ID generator from getter(?)
+# ToDo: If correlation event, yield base_events(?)
+class Esm:
+
+    def __init__(
+            self,
+            server: str,
+            port: int,
+            username: str,
+            password: str,
+            verify=True,
+            cert=None,
+            proxies: dict = None,
+            vault: Vault = None,
+            http_request_module: HttpRequest = None,
+            pool_size=10,
+            retries=3,
+            metadata_ttl: float = 300,
+            metadata_cache: ActiveListMetadataCache = None,
+            event_cache: EventCache = None,
+            token_max_age: float = 1_200,
+            lazy_login=False,
+            scheme='https'
+    ):
+        """
+        :param server:
+        :param port:
+        :param username:
+        :param password:
+        :param verify:
+        :param cert:
+        :param proxies:
+        :param vault:
+        :param http_request_module: An HTTP Request adaptor. Default - A pooled session owned (& closed) by the Esm.
+        :param pool_size: Keep-alive connections of the default session
+        :param retries: Retries of failed connections & gateway errors of the default session
+        :param metadata_ttl: Seconds to cache active list attributes (columns & key fields). 0 - No caching.
+        :param metadata_cache: A shared active list attributes cache. Default - A cache of `metadata_ttl`.
+        :param event_cache: A persistent cache of retrieved events (`EventCache`), looked up before requesting events.
+         Not closed by the Esm.
+        :param token_max_age: Seconds after which the token is refreshed before use (See `TokenManager`).
+         None - Only when rejected.
+        :param lazy_login: Log in on the first request, instead of here.
+        :param scheme: URL scheme, e.g. 'http' for a local mock (See `siemkit.simulate.arcsight.MockEsm`)
+        """
+
+        if http_request_module is None:
+            http_request_module = session_http_request_module(pool_size=pool_size, retries=retries)
+            self.__owns_http_request_module = True
+        else:
+            self.__owns_http_request_module = False
+
+        self.__http_request_module = http_request_module
+
+        server_id = f"{server}:{port}"
+        self.__url_base = f"{scheme}://{server_id}"
+
+        self.__verify = verify
+        self.__cert = cert
+        self.__proxies = proxies
+
+        if metadata_cache is None and metadata_ttl:
+            metadata_cache = ActiveListMetadataCache(ttl=metadata_ttl)
+
+        self.__metadata_cache = metadata_cache
+        self.__event_cache = event_cache
+
+        self.variables = {
+            'token': ''
+        }
+
+        self.__server_id = hex(
+            zlib.crc32(
+                bytes(server_id, 'utf-8')
+            )
+        )[2:]
+
+        self.__vault_name = f'arcsight.esm.{self.__server_id}'
+
+        if vault is None:
+            # For now, we are using an unsafe RAM Keyring until we can figure out
+            # something better as default.
+            vault = Vault(self.__vault_name, keyring_adaptor=RamKeyring())
+
+        self.__vault = vault
+
+        # vault.store_secret('username', username)
+        # vault.store_secret('password', password)
+
+        self.__login_status_code = None
+        self.__token_manager = TokenManager(self.__login, max_age=token_max_age, logout=self.__logout)
+
+        if lazy_login:
+            self.__vault.store_secret('username', username)
+            self.__vault.store_secret('password', password)
+        else:
+            self.refresh_token(username, password)
+
+    def __login(self) -> Union[str, None]:
+
+        response = self.unchecked_uri(
+            LoginApiEnum.LOGIN, {
+                'username': self.__vault.get_secret('username'),
+                'password': self.__vault.get_secret('password')
+            }
+        )
+        self.__login_status_code = response.status_code()
+
+        token = login_token(response)
+        if token:
+            self.variables['token'] = token
+
+        return token
+
+    def __logout(self, token: str):
+        # A replaced token (See `TokenManager`), `self.variables` already hold the new one.
+        self.unchecked_uri(LoginApiEnum.LOGOUT, dict(self.variables, token=token)).close()
+
+    def refresh_token(self, username=None, password=None):
+
+        if isinstance(username, str):
+            self.__vault.store_secret('username', username)
+
+        if isinstance(password, str):
+            self.__vault.store_secret('password', password)
+
+        self.__token_manager.refresh(force=True)
+
+        return self.__login_status_code
+
+    @property
+    def token_manager(self) -> TokenManager:
+        return self.__token_manager
+
+    def maintain_session(self):
+        response = self.get_session()
+        if response.status_code() == 500:
+            self.refresh_token()
+
+    def unchecked_uri(self, api: Union[ArcSightUri, ArcSightUriEnum], variables, stream=False) -> HttpResponse:
+
+        args = request_args(self.__url_base, api, variables, self.__verify, self.__cert, self.__proxies)
+
+        if stream:
+            args['stream'] = True  # The body is read by `HttpResponse.iter_text()`
+
+        return self.__http_request_module.request(**args)
+
+    def uri(self, api: Union[ArcSightUri, ArcSightUriEnum], variables, stream=False) -> HttpResponse:
+        """
+        Request with the current token (See `TokenManager`), retried once with a new token when it's rejected.
+        """
+
+        # self.maintain_session()  # Exposes token in URL
+
+        token = self.__token_manager.token()
+        variables = dict(variables, token=token or '')  # Callers may share `variables` across threads.
+
+        response = self.unchecked_uri(api=api, variables=variables, stream=stream)
+
+        if auth_failed(response):
+            response.close()
+            variables['token'] = self.__token_manager.refresh(stale_token=token, rejected=True) or ''
+            response = self.unchecked_uri(api=api, variables=variables, stream=stream)
+
+        return response
+
+    def logout(self):
+        """
+        :return: The logout status code, None if never logged in.
+        """
+
+        if not self.__token_manager:
+            status_code = None
+        else:
+            response = self.unchecked_uri(
+                LoginApiEnum.LOGOUT, self.variables
+            )
+            status_code = response.status_code()
+
+        self.__token_manager.invalidate()
+        self.__vault.delete_secret('username')
+        self.__vault.delete_secret('password')
+
+        return status_code
+
+    def get_session(self):
+
+        response = self.unchecked_uri(
+            LoginApiEnum.GET_SESSION, self.variables
+        )
+
+        return response
+
+    # def get_event_ids(self, *event_ids, start_millis='-1', end_millis='-1'):
+    #     return list(self.retrieve_event_ids(*event_ids, start_millis=start_millis, end_millis=end_millis))
+
+    def _retrieve_event_ids(self, *event_ids, start_millis='-1', end_millis='-1', stream=False):
+
+        event_ids = list(unpack_event_ids(event_ids))
+
+        response = self.uri(
+            *security_events_request(event_ids, start_millis=start_millis, end_millis=end_millis), stream=stream
+        )
+
+        return security_events(response, event_ids, stream=stream)
+
+    def retrieve_event_ids(
+            self,
+            *event_ids,
+            start_millis='-1',
+            end_millis='-1',
+            correlation=True,
+            aggregated=True,
+            base=True,
+            action=True,
+            sub_events=False,
+            events_cache=None,
+            deduplicate=True,
+            limit=-1,
+            chunk_size=200,
+            max_workers=4,
+            debug_recurse_level=0
+    ):
+        """
+        Retrieve events by their IDs.
+            Sub events (`baseEventIds`) are expanded breadth-first: each level's unseen IDs are requested
+             in chunks, concurrently, and events are yielded as their chunk arrives.
+            Events found in the `event_cache` (See `EventCache`) are served locally, retrieved events are added to it.
+
+        :param event_ids: Event IDs (int, str or iterables of them)
+        :param start_millis:
+        :param end_millis:
+        :param correlation: Yield correlation events
+        :param aggregated: Yield aggregated events
+        :param base: Yield base events
+        :param action: Yield action events
+        :param sub_events: Expand the base events of retrieved events
+        :param events_cache: A dictionary of retrieved events by ID. Cached IDs are not retrieved again.
+        :param deduplicate: Skip events which are already in the cache
+        :param limit: Maximum amount of events to yield. -1 for no limit.
+        :param chunk_size: Event IDs per request
+        :param max_workers: Concurrent requests
+        :param debug_recurse_level: Unused, kept for compatibility.
+        :return: Generator of events
+        """
+
+        expansion = EventIdsExpansion(
+            event_ids,
+            correlation=correlation,
+            aggregated=aggregated,
+            base=base,
+            action=action,
+            sub_events=sub_events,
+            events_cache=events_cache,
+            deduplicate=deduplicate,
+            limit=limit
+        )
+
+        from concurrent.futures import ThreadPoolExecutor  # Imported on use (`concurrent.futures` imports `logging`)
+        from concurrent.futures import as_completed
+
+        def retrieve_chunk(chunk):
+            return list(self._retrieve_event_ids(chunk, start_millis=start_millis, end_millis=end_millis))
+
+        event_cache = self.__event_cache
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = []
+        try:
+            while True:
+                # Serve locally while cached events lead to cached sub events.
+                while event_cache is not None:
+                    cached_events = expansion.cached(event_cache)
+                    if not cached_events:
+                        break
+                    yield from expansion.accept(cached_events)
+                    if expansion.done():
+                        return
+
+                chunks = expansion.chunks(chunk_size)
+                if not chunks:
+                    break
+
+                futures = [executor.submit(retrieve_chunk, chunk) for chunk in chunks]
+
+                for future in as_completed(futures):
+                    events = future.result()
+                    if event_cache is not None:
+                        event_cache.put_many(events)
+                    yield from expansion.accept(events)
+                    if expansion.done():
+                        return
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def base_events(self, correlation_event, events_cache=None):
+
+        if isinstance(correlation_event, dict):
+            base_events_list = correlation_event.get('baseEventIds')
+
+            if base_events_list is not None:
+                yield from self.retrieve_event_ids(base_events_list, events_cache=events_cache)
+
+    def get_activelist_attributes(self, resource_id, cached=True):
+        """
+        :param resource_id:
+        :param cached: Use the cached attributes (see `metadata_ttl`). False - Request & cache them.
+        :return:
+        """
+
+        if cached and self.__metadata_cache is not None:
+            attributes = self.__metadata_cache.get(resource_id)
+            if attributes is not None:
+                return attributes
+
+        attributes = activelist_attributes_response(
+            self.uri(*activelist_attributes_request(resource_id)), resource_id
+        )
+
+        if self.__metadata_cache is not None:
+            self.__metadata_cache.set(resource_id, attributes)
+
+        return attributes
+
+    def get_activelist_columns(self, resource_id):
+        return self.get_activelist_attributes(resource_id)['fieldNames']
+
+    def get_activelist_fields(self, resource_id):
+
+        return activelist_fields(self.get_activelist_attributes(resource_id))
+
+    def invalidate_activelist_metadata(self, resource_id=None):
+        """
+        Drop cached active list attributes (e.g. after the active list's fields were changed).
+            Also called on every failed write - the active list's columns may have changed.
+        :param resource_id: None - All active lists.
+        """
+        if self.__metadata_cache is not None:
+            self.__metadata_cache.invalidate(resource_id)
+
+    def get_activelist(self, resource_id, stream=False):
+        """
+        :param resource_id:
+        :param stream: Return a generator of the entries, decoded as the response is received
+         (Bounded memory, see `streamed_active_list_entries()`).
+        :return: The normalized entries
+        """
+
+        response = self.uri(*activelist_entries_request(resource_id), stream=stream)
+        check_activelist_entries_response(response, resource_id)
+
+        if stream:
+            return normalized_active_list_entries(response, stream=True)
+
+        entries = tuple(normalized_active_list_entries(response))
+
+        # if entries:
+        #     self._activelist_columns[resource_id] = entries[0].get('_columns_order')
+
+        return entries
+
+    def add_activelist_entries(self, resource_id, entries, chunk_size=None, max_workers=4):
+        """
+        :param resource_id:
+        :param entries: Entry (dict) or entries
+        :param chunk_size: Write in chunks of entries, in parallel (See `bulk_write_activelist_entries()`).
+         None - A single request.
+        :param max_workers: Concurrent chunk requests
+        :return: The chunk results, when written in chunks.
+        """
+
+        if not entries:
+            return
+
+        if chunk_size is not None:
+            return self.__bulk_write(resource_id, entries, delete=False, chunk_size=chunk_size, max_workers=max_workers)
+
+        self.__write_entries(resource_id, entries, delete=False)
+
+    def delete_activelist_entries(self, resource_id, entries, chunk_size=None, max_workers=4):
+        """
+        :param resource_id:
+        :param entries: Entry (dict) or entries
+        :param chunk_size: Delete in chunks of entries, in parallel (See `bulk_write_activelist_entries()`).
+         None - A single request.
+        :param max_workers: Concurrent chunk requests
+        :return: The chunk results, when deleted in chunks.
+        """
+
+        if not entries:
+            return
+
+        if chunk_size is not None:
+            return self.__bulk_write(resource_id, entries, delete=True, chunk_size=chunk_size, max_workers=max_workers)
+
+        self.__write_entries(resource_id, entries, delete=True)
+
+    def __write_entries(self, resource_id, entries, delete):
+
+        columns = entries_columns(entries)
+
+        if columns is None:
+            columns = self.get_activelist_columns(resource_id)
+
+        response = self.uri(*write_entries_request(resource_id, columns, entries, delete=delete))
+        check_write_entries_response(response, resource_id, delete=delete, metadata_cache=self.__metadata_cache)
+
+    def __bulk_write(self, resource_id, entries, delete, chunk_size, max_workers):
+
+        if isinstance(entries, dict):
+            entries = [entries]
+
+        results = sorted(
+            self.bulk_write_activelist_entries(
+                resource_id,
+                entries,
+                delete=delete,
+                chunk_size=chunk_size,
+                max_workers=max_workers
+            ),
+            key=lambda result_: result_['chunk']
+        )
+
+        failed = [result for result in results if result['error'] is not None]
+        if failed:
+            self.invalidate_activelist_metadata(resource_id)
+            raise Exception(f"Could not {'delete' if delete else 'add'} {sum(result['entries'] for result in failed)} "
+                            f"entries ({len(failed)} of {len(results)} chunks) of resource ID '{resource_id}': "
+                            f"{failed[0]['error']}")
+
+        return results
+
+    def bulk_write_activelist_entries(
+            self,
+            resource_id,
+            entries,
+            delete=False,
+            columns=None,
+            chunk_size=1_000,
+            max_bytes=1_048_576,
+            max_workers=4,
+            retries=2,
+            backoff=0.5
+    ) -> Generator[dict, None, None]:
+        """
+        Add (or delete) active list entries in chunks, sent in parallel. Failed chunks are retried.
+            Streaming - `entries` may be a generator, it's consumed as chunks are sent
+             (Up to `max_workers * 2` chunks are held in memory).
+
+        e.g.
+            for result in esm.bulk_write_activelist_entries(resource_id, generate_entries()):
+                if result['error']:
+                    ...
+
+        :param resource_id:
+        :param entries: Iterable of entries (dict)
+        :param delete: Delete the entries instead of adding them
+        :param columns: The written columns. Default - The entries' `_columns_order` or the active list's columns.
+        :param chunk_size: Maximum entries per request
+        :param max_bytes: Maximum estimated JSON bytes per request
+        :param max_workers: Concurrent requests
+        :param retries: Retries of a failed chunk
+        :param backoff: Retries backoff - {backoff} * (2 ** {retry number - 1}) seconds
+        :return: Generator of chunk results, as chunks complete:
+            {'chunk': index, 'entries': count, 'bytes': estimated size, 'attempts': count,
+             'status_code': last status code (None - no response), 'error': None or the last error}
+        """
+        from concurrent.futures import ThreadPoolExecutor  # Imported on use (`concurrent.futures` imports `logging`)
+        from concurrent.futures import FIRST_COMPLETED
+        from concurrent.futures import wait
+
+        entries = iter(entries)
+
+        if columns is None:
+            first_entry = next(entries, None)
+            if first_entry is None:
+                return
+            columns = first_entry.get('_columns_order')
+            if columns is None:
+                columns = self.get_activelist_columns(resource_id)
+            entries = chain((first_entry,), entries)
+
+        def write_chunk(index, chunk, chunk_bytes):
+
+            result = {
+                'chunk': index,
+                'entries': len(chunk),
+                'bytes': chunk_bytes,
+                'attempts': 0,
+                'status_code': None,
+                'error': None
+            }
+
+            for attempt in range(retries + 1):
+                if attempt:
+                    sleep(backoff * (2 ** (attempt - 1)))
+
+                result['attempts'] += 1
+
+                try:
+                    response = self.uri(*write_entries_request(resource_id, columns, chunk, delete=delete))
+                except Exception as e:
+                    result['status_code'] = None
+                    result['error'] = f"{type(e).__name__}: {e}"
+                    continue
+
+                result['status_code'] = response.status_code()
+                if result['status_code'] == 204:
+                    result['error'] = None
+                    break
+
+                result['error'] = f"Response {result['status_code']}"
+
+            return result
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = set()
+        try:
+            chunks = chunk_entries(entries, columns, chunk_size=chunk_size, max_bytes=max_bytes)
+            for index, (chunk, chunk_bytes) in enumerate(chunks):
+                pending.add(executor.submit(write_chunk, index, chunk, chunk_bytes))
+
+                if len(pending) >= max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def close(self):
+        """
+        Close the HTTP session, when owned by this Esm.
+        """
+        if self.__owns_http_request_module:
+            self.__http_request_module.close()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_tb:
+                raise
+        finally:
+            try:
+                self.logout()
+            finally:
+                self.close()
+
+
+class ActiveListSync:
+    """
+    Mirrors a source of truth (e.g. an LDAP group or a CSV file) into active lists, writing only the changes.
+
+        A local snapshot of every synchronized list maps its entries' key fields (`keyFields`) to a hash of
+         their other fields. A sync compares the source entries with the snapshot in a single pass,
+         deletes the entries which are gone, adds the new & changed ones (in chunks, see
+         `Esm.bulk_write_activelist_entries()`) and saves the new snapshot.
+
+        e.g.
+            sync = ActiveListSync(esm, 'state/activelists')
+            summary = sync.sync(resource_id, ({'userName': user, 'group': group} for user, group in members))
+
+    The first sync of a list (or `refresh=True`) builds the snapshot from the active list itself.
+    """
+
+    def __init__(self, esm: Esm, snapshot_dir: str, chunk_size=1_000, max_workers=4):
+        """
+        :param esm:
+        :param snapshot_dir: Directory of the snapshot files (One per active list)
+        :param chunk_size: Entries per write request
+        :param max_workers: Concurrent write requests
+        """
+        self.__esm = esm
+        self.__snapshot_dir = snapshot_dir
+        self.__chunk_size = chunk_size
+        self.__max_workers = max_workers
+
+    @staticmethod
+    def value(value) -> str:
+        # Active lists hold strings.
+        return '' if value is None else str(value)
+
+    @staticmethod
+    def key(values) -> tuple:
+        return tuple(values)  # The key fields' values, as is (Deletes are built from them).
+
+    @staticmethod
+    def digest(values) -> str:
+        # The repr of the values (strings) is quoted & escaped, values can't run into each other.
+        return hashlib.blake2b(repr(values).encode('utf-8'), digest_size=8).hexdigest()
+
+    def snapshot_path(self, resource_id) -> str:
+        return os.path.join(self.__snapshot_dir, f"{resource_id}.json")
+
+    def load_snapshot(self, resource_id) -> Union[dict, None]:
+        """
+        :param resource_id:
+        :return: {'columns': [...], 'key_columns': [...], 'entries': {(key values): hash}}, or None
+        """
+        path = self.snapshot_path(resource_id)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'r', encoding='utf-8') as fs:
+            snapshot = json.load(fs)
 
-# ToDo: Separate event ID generator from getter(?)
-# ToDo: If correlation event, yield base_events(?)
-class Esm:
+        if not isinstance(snapshot.get('entries'), list):
+            return None  # An older snapshot format, rebuilt from the active list.
+
+        snapshot['entries'] = {tuple(entry_key): entry_digest for entry_key, entry_digest in snapshot['entries']}
+        return snapshot
+
+    def save_snapshot(self, resource_id, snapshot: dict):
+
+        if not os.path.exists(self.__snapshot_dir):
+            os.makedirs(self.__snapshot_dir)
+
+        path = self.snapshot_path(resource_id)
+        temporary_path = f"{path}.tmp"
+
+        # JSON objects can't have (key values) keys, entries are saved as [[key values, hash], ...].
+        snapshot = dict(snapshot, entries=list(snapshot['entries'].items()))
+
+        with open(temporary_path, 'w', encoding='utf-8') as fs:
+            fs.write(json.dumps(snapshot))  # Faster than streaming `json.dump()` chunks.
+
+        os.replace(temporary_path, path)  # A crash never leaves a partial snapshot.
+
+    def build_snapshot(self, resource_id) -> dict:
+        """
+        Build the snapshot of an active list from its current entries.
+        """
+        fields = self.__esm.get_activelist_fields(resource_id)
+
+        columns = list(fields)
+        key_columns = [column for column, field in fields.items() if field['key']] or columns
+        value_columns = [column for column in columns if column not in key_columns]
+
+        value, key, digest = self.value, self.key, self.digest
+
+        snapshot_entries = {}
+        for entry in self.__esm.get_activelist(resource_id, stream=True):
+            entry_key = key([value(entry.get(column)) for column in key_columns])
+            snapshot_entries[entry_key] = digest([value(entry.get(column)) for column in value_columns])
+
+        return {
+            'columns': columns,
+            'key_columns': key_columns,
+            'entries': snapshot_entries
+        }
+
+    def sync(self, resource_id, entries, refresh=False, dry_run=False) -> dict:
+        """
+        Synchronize an active list with the source entries.
+        :param resource_id:
+        :param entries: Iterable of the source entries (dict of column -> value). Consumed once, lazily.
+        :param refresh: Rebuild the snapshot from the active list first (e.g. when it's changed by others)
+        :param dry_run: Compute the changes without writing them (or the snapshot)
+        :return: Summary - {'added': int, 'updated': int, 'deleted': int, 'unchanged': int, 'chunks': [results]}
+        """
+        if refresh:
+            self.__esm.invalidate_activelist_metadata(resource_id)
+
+        snapshot = None if refresh else self.load_snapshot(resource_id)
+        if snapshot is None:
+            snapshot = self.build_snapshot(resource_id)
+
+        columns = snapshot['columns']
+        key_columns = snapshot['key_columns']
+        value_columns = [column for column in columns if column not in key_columns]
+        previous_entries = snapshot['entries']
+
+        value, key, digest = self.value, self.key, self.digest
+
+        current_entries = {}
+        writes = []
+        summary = {
+            'added': 0,
+            'updated': 0,
+            'deleted': 0,
+            'unchanged': 0,
+            'chunks': []
+        }
+
+        for entry in entries:
+            entry_key = key([value(entry.get(column)) for column in key_columns])
+            entry_digest = digest([value(entry.get(column)) for column in value_columns])
+
+            current_entries[entry_key] = entry_digest
+
+            previous_digest = previous_entries.get(entry_key)
+            if previous_digest == entry_digest:
+                summary['unchanged'] += 1
+                continue
+
+            summary['added' if previous_digest is None else 'updated'] += 1
+            writes.append({column: value(entry.get(column)) for column in columns})
+
+        # Gone entries are deleted by their key fields.
+        deletes = [
+            dict(zip(key_columns, entry_key))
+            for entry_key in previous_entries
+            if entry_key not in current_entries
+        ]
+        summary['deleted'] = len(deletes)
+
+        if dry_run:
+            return summary
+
+        for delete, write_entries, write_columns in ((True, deletes, key_columns), (False, writes, columns)):
+            if not write_entries:
+                continue
+
+            results = list(
+                self.__esm.bulk_write_activelist_entries(
+                    resource_id,
+                    write_entries,
+                    delete=delete,
+                    columns=write_columns,
+                    chunk_size=self.__chunk_size,
+                    max_workers=self.__max_workers
+                )
+            )
+            summary['chunks'].extend(results)
+
+            failed = [result for result in results if result['error'] is not None]
+            if failed:
+                # The snapshot isn't saved, the next sync writes the changes again.
+                raise Exception(f"Could not sync resource ID '{resource_id}', "
+                                f"{len(failed)} of {len(results)} chunks failed: {failed[0]['error']}")
+
+        snapshot['entries'] = current_entries
+        self.save_snapshot(resource_id, snapshot)
+
+        return summary
+
+
+class Routing(str, Enum):
+
+    ROUND_ROBIN = 'round_robin'
+    LEAST_OUTSTANDING = 'least_outstanding'
+
+    def __str__(self):
+        return self.value
+
+
+def transport_failure(exception: Exception) -> bool:
+    """
+    Whether an exception is a manager (connection) failure - a connection error or a timeout of the HTTP module.
+        Any other exception (API errors, e.g. a missing resource, or local errors, e.g. illegal entries) is raised as is.
+    """
+    # The HTTP modules are injected (see `siemkit.adaptors`), an exception of a module means the module was imported.
+    requests = sys.modules.get('requests')
+    if requests is not None and isinstance(exception, requests.RequestException):
+        return isinstance(exception, (requests.ConnectionError, requests.Timeout))
+
+    aiohttp = sys.modules.get('aiohttp')
+    if aiohttp is not None and isinstance(exception, aiohttp.ClientError):
+        return True
+
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is not None and isinstance(exception, asyncio.TimeoutError):
+        return True
+
+    return isinstance(exception, OSError)
+
+
+class EsmPool:
+    """
+    A pool of `Esm` clients of several managers, for spreading load:
+        - Reads are routed round-robin, or to the client with the least outstanding requests.
+        - Writes are fanned out to all the managers (`fan_out_writes`), or routed like reads.
+        - A manager failing `failure_threshold` times in a row (connection errors, not API errors)
+          is skipped for `recovery_interval` seconds. Failed reads fail over to the next manager.
+        - `health_check()` probes the managers (`getSession`), periodically with `health_check_interval`.
+
+        e.g.
+            with EsmPool([Esm(server, 8443, username, password) for server in servers]) as pool:
+                entries = pool.get_activelist(resource_id)
+    """
+
+    def __init__(
+            self,
+            clients,
+            routing: Routing = Routing.ROUND_ROBIN,
+            fan_out_writes=False,
+            failure_threshold=3,
+            recovery_interval=30,
+            health_check_interval=None
+    ):
+        """
+        :param clients: `Esm` clients, one per manager
+        :param routing: Reads routing
+        :param fan_out_writes: Write to all the managers (e.g. active lists which aren't replicated between them)
+        :param failure_threshold: Consecutive failures marking a manager as down
+        :param recovery_interval: Seconds to skip a down manager, before trying it again
+        :param health_check_interval: Seconds between background health checks. None/0 - Only on `health_check()`.
+        """
+        self.__clients = list(clients)
+        if not self.__clients:
+            raise Exception("An ESM pool requires at least one client.")
+
+        self.__routing = Routing(routing)
+        self.__fan_out_writes = fan_out_writes
+        self.__failure_threshold = failure_threshold
+        self.__recovery_interval = recovery_interval
+
+        self.__lock = threading.Lock()
+        self.__next = 0
+        self.__outstanding = [0] * len(self.__clients)
+        self.__requests = [0] * len(self.__clients)
+        self.__failures = [0] * len(self.__clients)
+        self.__down_until = [0.0] * len(self.__clients)
+
+        self.__stopped = threading.Event()
+        self.__thread = None
+        if health_check_interval:
+            self.__thread = threading.Thread(
+                target=self.__health_checks,
+                args=(health_check_interval,),
+                name='siemkit-esm-pool',
+                daemon=True
+            )
+            self.__thread.start()
+
+    @property
+    def clients(self) -> list:
+        return list(self.__clients)
+
+    def __healthy(self, index, now) -> bool:
+        return self.__down_until[index] <= now
+
+    def __candidates(self) -> list:
+        """
+        :return: Client indexes by routing order, the healthy ones first.
+        """
+        with self.__lock:
+            now = monotonic()
+            count = len(self.__clients)
+
+            start = self.__next
+            self.__next = (self.__next + 1) % count
+            order = [(start + offset) % count for offset in range(count)]
+
+            if self.__routing is Routing.LEAST_OUTSTANDING:
+                order.sort(key=lambda index: self.__outstanding[index])  # Stable - Ties stay round-robin.
+
+            return (
+                [index for index in order if self.__healthy(index, now)] +
+                [index for index in order if not self.__healthy(index, now)]
+            )
+
+    def __begin(self, index):
+        with self.__lock:
+            self.__outstanding[index] += 1
+            self.__requests[index] += 1
+
+    def __end(self, index, failure: Union[Exception, None]):
+        with self.__lock:
+            self.__outstanding[index] -= 1
+
+            if failure is None:
+                self.__failures[index] = 0
+                self.__down_until[index] = 0.0
+            elif transport_failure(failure):
+                self.__failures[index] += 1
+                if self.__failures[index] >= self.__failure_threshold:
+                    self.__down_until[index] = monotonic() + self.__recovery_interval
+
+    def __call(self, index, method, *args, **kwargs):
+        self.__begin(index)
+        try:
+            result = getattr(self.__clients[index], method)(*args, **kwargs)
+        except Exception as e:
+            self.__end(index, e)
+            raise
+        self.__end(index, None)
+        return result
+
+    def read(self, method: str, *args, **kwargs):
+        """
+        Call an `Esm` method on a routed client, failing over to the next clients on connection failures.
+        :param method: `Esm` method name
+        :return: The method's result
+        """
+        failure = None
+
+        for index in self.__candidates():
+            try:
+                return self.__call(index, method, *args, **kwargs)
+            except Exception as e:
+                if not transport_failure(e):
+                    raise
+                failure = e
+
+        raise failure
+
+    def read_stream(self, method: str, *args, **kwargs) -> Generator:
+        """
+        Iterate an `Esm` generator method on a routed client.
+            Fails over to the next clients on connection failures, until the first item was yielded.
+        :param method: `Esm` method name
+        :return: The method's items
+        """
+        failure = None
+
+        for index in self.__candidates():
+            yielded = False
+            self.__begin(index)
+            try:
+                for item in getattr(self.__clients[index], method)(*args, **kwargs):
+                    yielded = True
+                    yield item
+            except Exception as e:
+                self.__end(index, e)
+                if yielded or not transport_failure(e):
+                    raise
+                failure = e
+                continue
+            except BaseException:  # e.g. GeneratorExit, when the consumer stops early.
+                self.__end(index, None)
+                raise
+
+            self.__end(index, None)
+            return
+
+        raise failure
+
+    def write(self, method: str, *args, **kwargs):
+        """
+        Call an `Esm` write method on all the clients (`fan_out_writes`), or on a routed client.
+        :param method: `Esm` method name
+        :return: The results of each client (Fan out), or the method's result
+        """
+        if not self.__fan_out_writes:
+            return self.read(method, *args, **kwargs)
+
+        results = []
+        failures = []
+
+        for index in range(len(self.__clients)):
+            try:
+                results.append(self.__call(index, method, *args, **kwargs))
+            except Exception as e:
+                results.append(None)
+                failures.append(f"#{index} {type(e).__name__}: {e}")
+
+        if failures:
+            raise Exception(f"Write '{method}' failed on {len(failures)} of {len(self.__clients)} managers: "
+                            f"{'; '.join(failures)}")
+
+        return results
+
+    def get_activelist_attributes(self, resource_id, cached=True):
+        return self.read('get_activelist_attributes', resource_id, cached=cached)
+
+    def get_activelist_columns(self, resource_id):
+        return self.read('get_activelist_columns', resource_id)
+
+    def get_activelist_fields(self, resource_id):
+        return self.read('get_activelist_fields', resource_id)
+
+    def get_activelist(self, resource_id, stream=False):
+        if stream:
+            return self.read_stream('get_activelist', resource_id, stream=True)
+        return self.read('get_activelist', resource_id)
+
+    def retrieve_event_ids(self, *event_ids, **kwargs):
+        """
+        See `Esm.retrieve_event_ids()`.
+        """
+        return self.read_stream('retrieve_event_ids', *event_ids, **kwargs)
+
+    def base_events(self, correlation_event, events_cache=None):
+        return self.read_stream('base_events', correlation_event, events_cache=events_cache)
+
+    def add_activelist_entries(self, resource_id, entries, chunk_size=None, max_workers=4):
+        return self.write('add_activelist_entries', resource_id, entries, chunk_size=chunk_size, max_workers=max_workers)
+
+    def delete_activelist_entries(self, resource_id, entries, chunk_size=None, max_workers=4):
+        return self.write(
+            'delete_activelist_entries', resource_id, entries, chunk_size=chunk_size, max_workers=max_workers
+        )
+
+    def bulk_write_activelist_entries(self, resource_id, entries, **kwargs) -> Generator[dict, None, None]:
+        """
+        See `Esm.bulk_write_activelist_entries()`. Fanned out results have the client's index (`client`).
+            Fanning out holds all the entries in memory.
+        """
+        if not self.__fan_out_writes:
+            yield from self.read_stream('bulk_write_activelist_entries', resource_id, entries, **kwargs)
+            return
+
+        entries = list(entries)
+
+        for index, client in enumerate(self.__clients):
+            self.__begin(index)
+            failure = None
+            try:
+                for result in client.bulk_write_activelist_entries(resource_id, entries, **kwargs):
+                    result['client'] = index
+                    yield result
+            except Exception as e:
+                failure = e
+                raise
+            finally:
+                self.__end(index, failure)
+
+    def invalidate_activelist_metadata(self, resource_id=None):
+        for client in self.__clients:
+            client.invalidate_activelist_metadata(resource_id)
+
+    def health_check(self) -> list:
+        """
+        Probe every manager (`getSession`). A manager answering (Even rejecting the token) is up.
+        :return: Whether each manager is up
+        """
+        results = []
+
+        for index, client in enumerate(self.__clients):
+            try:
+                response = client.get_session()
+                up = response.status_code() < 500 or auth_failed(response)
+            except Exception:
+                up = False
+
+            with self.__lock:
+                if up:
+                    self.__failures[index] = 0
+                    self.__down_until[index] = 0.0
+                else:
+                    self.__failures[index] = max(self.__failures[index], self.__failure_threshold)
+                    self.__down_until[index] = monotonic() + self.__recovery_interval
+
+            results.append(up)
+
+        return results
+
+    def __health_checks(self, interval):
+        while not self.__stopped.wait(interval):
+            self.health_check()
+
+    def status(self) -> list:
+        """
+        :return: The state of each client - {'healthy': bool, 'outstanding': int, 'requests': int, 'failures': int}
+        """
+        with self.__lock:
+            now = monotonic()
+            return [
+                {
+                    'healthy': self.__healthy(index, now),
+                    'outstanding': self.__outstanding[index],
+                    'requests': self.__requests[index],
+                    'failures': self.__failures[index]
+                }
+                for index in range(len(self.__clients))
+            ]
+
+    def logout(self):
+        return [client.logout() for client in self.__clients]
+
+    def close(self):
+        self.__stopped.set()
+        for client in self.__clients:
+            client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.logout()
+        finally:
+            self.close()
+
+
+def aiohttp_http_request_module(pool_size=10) -> AsyncHttpRequest:
+    """
+    The default async HTTP adaptor of `AsyncEsm` (See `siemkit.adaptors.AiohttpModule`).
+    """
+    import aiohttp
+
+    return AiohttpModule(aiohttp, pool_size=pool_size)
+
+
+class AsyncEsm:
+    """
+    An asyncio ArcSight ESM client, building its requests like `Esm`.
+        Calls of many resources and many managers can overlap:
+
+        async with AsyncEsm(server, 8443, username, password) as esm:
+            active_lists = await asyncio.gather(
+                *(esm.get_activelist(resource_id) for resource_id in resource_ids)
+            )
+
+            async for event in esm.retrieve_event_ids(correlation_event_id, sub_events=True):
+                ...
+
+    The login happens on `async with`, an explicit `await esm.refresh_token()` or the first request.
+        The token is refreshed like the one of `Esm` (See `AsyncTokenManager`).
+    """
 
     def __init__(
             self,
@@ -48,16 +1979,56 @@ class Esm:
             verify=True,
             cert=None,
             proxies: dict = None,
-            vault: Vault = None
+            vault: Vault = None,
+            http_request_module: AsyncHttpRequest = None,
+            pool_size=10,
+            metadata_ttl: float = 300,
+            metadata_cache: ActiveListMetadataCache = None,
+            event_cache: EventCache = None,
+            token_max_age: float = 1_200,
+            scheme='https'
     ):
+        """
+        :param server:
+        :param port:
+        :param username:
+        :param password:
+        :param verify:
+        :param cert:
+        :param proxies:
+        :param vault:
+        :param http_request_module: An async HTTP Request adaptor. Default - An `aiohttp` session owned by the AsyncEsm.
+        :param pool_size: Concurrent connections of the default session
+        :param metadata_ttl: Seconds to cache active list attributes (columns & key fields). 0 - No caching.
+        :param metadata_cache: A shared active list attributes cache. Default - A cache of `metadata_ttl`.
+        :param event_cache: A persistent cache of retrieved events (`EventCache`), looked up before requesting events.
+         Not closed by the AsyncEsm.
+        :param token_max_age: Seconds after which the token is refreshed before use (See `AsyncTokenManager`).
+         None - Only when rejected.
+        :param scheme: URL scheme, e.g. 'http' for a local mock (See `siemkit.simulate.arcsight.MockEsm`)
+        """
+
+        if http_request_module is None:
+            http_request_module = aiohttp_http_request_module(pool_size=pool_size)
+            self.__owns_http_request_module = True
+        else:
+            self.__owns_http_request_module = False
+
+        self.__http_request_module = http_request_module
 
         server_id = f"{server}:{port}"
-        self.__url_base = f"https://{server_id}"
+        self.__url_base = f"{scheme}://{server_id}"
 
         self.__verify = verify
         self.__cert = cert
         self.__proxies = proxies
 
+        if metadata_cache is None and metadata_ttl:
+            metadata_cache = ActiveListMetadataCache(ttl=metadata_ttl)
+
+        self.__metadata_cache = metadata_cache
+        self.__event_cache = event_cache
+
         self.variables = {
             'token': ''
         }
@@ -77,128 +2048,110 @@ class Esm:
 
         self.__vault = vault
 
-        # vault.store_secret('username', username)
-        # vault.store_secret('password', password)
-
-        # self._activelist_columns = {}
+        self.__vault.store_secret('username', username)
+        self.__vault.store_secret('password', password)
 
-        self.refresh_token(username, password)
+        self.__login_status_code = None
+        self.__token_manager = AsyncTokenManager(self.__login, max_age=token_max_age, logout=self.__logout)
 
-    def refresh_token(self, username=None, password=None):
-
-        if isinstance(username, str):
-            self.__vault.store_secret('username', username)
+    async def __login(self) -> Union[str, None]:
 
-        if isinstance(password, str):
-            self.__vault.store_secret('password', password)
-
-        response = self.unchecked_uri(
+        response = await self.unchecked_uri(
             LoginApiEnum.LOGIN, {
                 'username': self.__vault.get_secret('username'),
                 'password': self.__vault.get_secret('password')
             }
         )
+        self.__login_status_code = response.status_code()
 
-        if response.status_code() == 200:
+        token = login_token(response)
+        if token:
+            self.variables['token'] = token
 
-            self.variables['token'] = (
-                response.json()
-                    .get('log.loginResponse', {})
-                    .get('log.return', '')
-            )
-
-        return response.status_code()
-
-    def maintain_session(self):
-        response = self.get_session()
-        if response.status_code() == 500:
-            self.refresh_token()
-
-    def unchecked_uri(self, api: Union[ArcSightUri, ArcSightUriEnum], variables) -> HttpResponse:
+        return token
 
-        if isinstance(api, ArcSightUriEnum):
-            api = api.value
+    async def __logout(self, token: str):
+        # A replaced token (See `AsyncTokenManager`), `self.variables` already hold the new one.
+        (await self.unchecked_uri(LoginApiEnum.LOGOUT, dict(self.variables, token=token))).close()
 
-        uri, request_args = api.args(variables=variables)
+    async def refresh_token(self, username=None, password=None):
 
-        request_args.update(
-            {
-                'url': f"{self.__url_base}{uri}",
-                'verify': self.__verify,
-                'cert': self.__cert,
-                'proxies': self.__proxies
-            }
-        )
+        if isinstance(username, str):
+            self.__vault.store_secret('username', username)
 
-        return http_request_module.request(**request_args)
+        if isinstance(password, str):
+            self.__vault.store_secret('password', password)
 
-    def uri(self, api: Union[ArcSightUri, ArcSightUriEnum], variables) -> HttpResponse:
+        await self.__token_manager.refresh(force=True)
 
-        # self.maintain_session()  # Exposes token in URL
+        return self.__login_status_code
 
-        return self.unchecked_uri(api=api, variables=variables)
+    @property
+    def token_manager(self) -> AsyncTokenManager:
+        return self.__token_manager
 
-    def logout(self):
+    async def maintain_session(self):
+        response = await self.get_session()
+        if response.status_code() == 500:
+            await self.refresh_token()
 
-        response = self.unchecked_uri(
-            LoginApiEnum.LOGOUT, self.variables
+    async def unchecked_uri(self, api: Union[ArcSightUri, ArcSightUriEnum], variables) -> HttpResponse:
+        return await self.__http_request_module.request(
+            **request_args(self.__url_base, api, variables, self.__verify, self.__cert, self.__proxies)
         )
 
-        self.__vault.delete_secret('username')
-        self.__vault.delete_secret('password')
+    async def uri(self, api: Union[ArcSightUri, ArcSightUriEnum], variables) -> HttpResponse:
+        """
+        Request with the current token (See `AsyncTokenManager`), retried once with a new token when it's rejected.
+        """
 
-        return response.status_code()
+        token = await self.__token_manager.token()
+        variables = dict(variables, token=token or '')  # Callers may share `variables` across tasks.
 
-    def get_session(self):
+        response = await self.unchecked_uri(api=api, variables=variables)
 
-        response = self.unchecked_uri(
-            LoginApiEnum.GET_SESSION, self.variables
-        )
+        if auth_failed(response):
+            response.close()
+            variables['token'] = await self.__token_manager.refresh(stale_token=token, rejected=True) or ''
+            response = await self.unchecked_uri(api=api, variables=variables)
 
         return response
 
-    # def get_event_ids(self, *event_ids, start_millis='-1', end_millis='-1'):
-    #     return list(self.retrieve_event_ids(*event_ids, start_millis=start_millis, end_millis=end_millis))
+    async def logout(self):
+        """
+        :return: The logout status code, None if never logged in.
+        """
 
-    def _retrieve_event_ids(self, *event_ids, start_millis='-1', end_millis='-1'):
-
-        def extract_ids():
-            for event_id in event_ids:
-                if isinstance(event_id, int):
-                    yield event_id
-                elif isinstance(event_id, str):
-                    yield int(event_id)
-                elif isinstance(event_id, Iterable):
-                    for id_ in event_id:
-                        yield int(id_)
-
-        variables = {
-            'event_ids': list(extract_ids()),
-            'start_millis': start_millis,
-            'end_millis': end_millis
-        }
+        if not self.__token_manager:
+            status_code = None
+        else:
+            response = await self.unchecked_uri(
+                LoginApiEnum.LOGOUT, self.variables
+            )
+            status_code = response.status_code()
 
-        variables.update(self.variables)
+        self.__token_manager.invalidate()
+        self.__vault.delete_secret('username')
+        self.__vault.delete_secret('password')
 
-        response = self.uri(
-            EventsApiEnum.GET_SECURITY_EVENTS, variables
-        )
+        return status_code
 
-        response_json = response.json()
+    async def get_session(self):
+        return await self.unchecked_uri(
+            LoginApiEnum.GET_SESSION, self.variables
+        )
 
-        sev_get_security_events_response = response_json.get('sev.getSecurityEventsResponse')
+    async def _retrieve_event_ids(self, *event_ids, start_millis='-1', end_millis='-1'):
 
-        has_entries = 'sev.return' in sev_get_security_events_response
+        event_ids = list(unpack_event_ids(event_ids))
 
-        if response.status_code() != 200:
-            raise Exception(f"(Response {response.status_code()}) "
-                            f"Could not retrieve event IDs '{' ,'.join(event_ids)}'.")
-        elif not has_entries:
-            raise Exception(f"Event IDs '{' ,'.join((str(event_id) for event_id in event_ids))}' were not found.")
+        response = await self.uri(
+            *security_events_request(event_ids, start_millis=start_millis, end_millis=end_millis)
+        )
 
-        return simplified_cef_events(response)
+        return list(security_events(response, event_ids))
 
-    def retrieve_event_ids(
+    async def retrieve_event_ids(
             self,
             *event_ids,
             start_millis='-1',
@@ -211,251 +2164,180 @@ class Esm:
             events_cache=None,
             deduplicate=True,
             limit=-1,
-            debug_recurse_level=0
+            chunk_size=200,
+            max_workers=4
     ):
+        """
+        The async generator version of `Esm.retrieve_event_ids()`.
+            `max_workers` limits the concurrent requests.
+        """
+
+        import asyncio  # Imported on use, as `siemkit.arcsight` is mostly used synchronously.
+
+        expansion = EventIdsExpansion(
+            event_ids,
+            correlation=correlation,
+            aggregated=aggregated,
+            base=base,
+            action=action,
+            sub_events=sub_events,
+            events_cache=events_cache,
+            deduplicate=deduplicate,
+            limit=limit
+        )
 
-        if events_cache is None:
-            events_cache = {}
-
-        def unpack_ids(event_ids_):
-            for event_id_ in event_ids_:
-                if isinstance(event_id_, int):
-                    yield event_id_
-                elif isinstance(event_id_, str):
-                    yield int(event_id_)
-                elif isinstance(event_id_, Iterable):
-                    for id_ in event_id_:
-                        yield int(id_)
-
-        def new_event_ids(event_ids_):
-            for event_id_ in event_ids_:
-                if event_id_ not in events_cache:
-                    yield event_id_
-
-        # def cached_event_ids(event_ids_):
-        #     for event_id_ in event_ids_:
-        #         if event_id_ in events_cache:
-        #             yield event_id_
-
-        unpacked_event_ids = list(unpack_ids(event_ids))
-        if deduplicate:
-            # Only new event IDs -- For recursive use
-            event_ids = new_event_ids(unpacked_event_ids)
-        else:
-            event_ids = unpacked_event_ids
-
-        retrieve_types = set()
-
-        if correlation:
-            retrieve_types.add('CORRELATION')
-        if aggregated:
-            retrieve_types.add('AGGREGATED')
-        if base:
-            retrieve_types.add('BASE')
-        if action:
-            retrieve_types.add('ACTION')
-
-        # # Unload from cache
-        # if not deduplicate:
-        #     for event_id in cached_event_ids(event_ids):
-        #         cached_event = events_cache.get(event_id)
-        #         if cached_event is not None:
-        #             cached_event_type = cached_event.get('type')
-        #             if cached_event_type in retrieve_types:
-        #                 input("From Cache:")
-        #                 yield cached_event
-
-        # New events to retrieve
-        retrieve_event_ids = list(new_event_ids(event_ids))
-        # input(f"Cache: {events_cache.keys()} | To Retrieve: {retrieve_event_ids}")
-
-        for event in self._retrieve_event_ids(
-                retrieve_event_ids,
-                start_millis=start_millis,
-                end_millis=end_millis
-        ):
-
-            event_id = event.get('eventId')
-            event_type = event.get('type')
-
-            if event_id in events_cache:
-                if deduplicate:
-                    continue
-            events_cache[event_id] = event  # Store in cache
+        semaphore = asyncio.Semaphore(max_workers)
 
-            if event_type is not None:
-                if event_type in retrieve_types:
+        async def retrieve_chunk(chunk):
+            async with semaphore:
+                return await self._retrieve_event_ids(chunk, start_millis=start_millis, end_millis=end_millis)
 
-                    # print(f"Current level {level} | Event ID: {event_id} | Cache: {events_cache.keys()}
-                    # | To Retrieve: {retrieve_event_ids}")
+        event_cache = self.__event_cache
 
-                    if limit == 0:
-                        return
+        while True:
+            # Serve locally while cached events lead to cached sub events.
+            while event_cache is not None:
+                cached_events = expansion.cached(event_cache)
+                if not cached_events:
+                    break
+                for event in expansion.accept(cached_events):
                     yield event
-                    limit -= 1
-
-                if sub_events:
-                    base_event_ids = event.get('baseEventIds')
-                    if base_event_ids:
-                        yield from self.retrieve_event_ids(
-                            [base_event_id for base_event_id in base_event_ids if base_event_id not in events_cache or (deduplicate and base_event_id not in retrieve_event_ids)],
-                            start_millis=start_millis,
-                            end_millis=end_millis,
-                            correlation=correlation,
-                            aggregated=aggregated,
-                            base=base,
-                            action=action,
-                            sub_events=sub_events,
-                            events_cache=events_cache,
-                            deduplicate=deduplicate,
-                            limit=limit,
-                            debug_recurse_level=debug_recurse_level + 1
-                        )
+                if expansion.done():
+                    return
+
+            chunks = expansion.chunks(chunk_size)
+            if not chunks:
+                break
+
+            tasks = [asyncio.ensure_future(retrieve_chunk(chunk)) for chunk in chunks]
+            try:
+                for next_chunk in asyncio.as_completed(tasks):
+                    events = await next_chunk
+                    if event_cache is not None:
+                        event_cache.put_many(events)
+                    for event in expansion.accept(events):
+                        yield event
+                    if expansion.done():
+                        return
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)  # Wait for the cancellations.
 
-    def base_events(self, correlation_event, events_cache=None):
+    async def base_events(self, correlation_event, events_cache=None):
 
         if isinstance(correlation_event, dict):
             base_events_list = correlation_event.get('baseEventIds')
 
             if base_events_list is not None:
-                yield from self.retrieve_event_ids(base_events_list, events_cache=events_cache)
-
-    def get_activelist_attributes(self, resource_id):
-        variables = {
-            'uuid': resource_id
-        }
-        variables.update(self.variables)  # Get the token
-
-        response = self.uri(
-            ActiveListApiEnum.FIND_BY_UUID, variables
-        )
-
-        if response.status_code() != 200:
-            raise Exception(f"(Response {response.status_code()}) "
-                            f"Could not retrieve resource ID '{resource_id}'.")
-
-        return response.json()['act.findByUUIDResponse']['act.return']
-
-    def get_activelist_columns(self, resource_id):
-        return self.get_activelist_attributes(resource_id)['fieldNames']
-
-    def get_activelist_fields(self, resource_id):
+                async for event in self.retrieve_event_ids(base_events_list, events_cache=events_cache):
+                    yield event
 
-        response_json = self.get_activelist_attributes(resource_id)
+    async def get_activelist_attributes(self, resource_id, cached=True):
+        """
+        :param resource_id:
+        :param cached: Use the cached attributes (see `metadata_ttl`). False - Request & cache them.
+        :return:
+        """
 
-        result = {}
+        if cached and self.__metadata_cache is not None:
+            attributes = self.__metadata_cache.get(resource_id)
+            if attributes is not None:
+                return attributes
 
-        for index, field in enumerate(response_json['fieldNames']):
-            result[field] = {
-                'key': response_json['keyFields'][index],
-                'type': response_json['fieldTypes'][index]
-            }
+        attributes = activelist_attributes_response(
+            await self.uri(*activelist_attributes_request(resource_id)), resource_id
+        )
 
-        return result
+        if self.__metadata_cache is not None:
+            self.__metadata_cache.set(resource_id, attributes)
 
-    def get_activelist(self, resource_id):
+        return attributes
 
-        variables = {
-            'resource_id': resource_id
-        }
-        variables.update(self.variables)  # Get the token
+    async def get_activelist_columns(self, resource_id):
+        return (await self.get_activelist_attributes(resource_id))['fieldNames']
 
-        response = self.uri(
-            ActiveListApiEnum.GET_ENTRIES, variables
-        )
+    async def get_activelist_fields(self, resource_id):
+        return activelist_fields(await self.get_activelist_attributes(resource_id))
 
-        if response.status_code() != 200:
-            raise Exception(f"(Response {response.status_code()}) "
-                            f"Could not retrieve resource ID '{resource_id}'.")
+    def invalidate_activelist_metadata(self, resource_id=None):
+        """
+        Drop cached active list attributes (e.g. after the active list's fields were changed).
+            Also called on every failed write - the active list's columns may have changed.
+        :param resource_id: None - All active lists.
+        """
+        if self.__metadata_cache is not None:
+            self.__metadata_cache.invalidate(resource_id)
 
-        entries = tuple(normalized_active_list_entries(response))
+    async def get_activelist(self, resource_id):
 
-        # if entries:
-        #     self._activelist_columns[resource_id] = entries[0].get('_columns_order')
+        response = await self.uri(*activelist_entries_request(resource_id))
+        check_activelist_entries_response(response, resource_id)
 
-        return entries
+        return tuple(normalized_active_list_entries(response))
 
-    def add_activelist_entries(self, resource_id, entries):
+    async def add_activelist_entries(self, resource_id, entries):
 
         if not entries:
             return
 
-        if isinstance(entries, dict):
-            columns = entries.get('_columns_order')
-        elif not isinstance(entries, str) and hasattr(entries, '__getitem__'):
-            columns = entries[0].get('_columns_order')
-        else:
-            raise TypeError(f"Illegal entries object: {entries}")
-
-        if columns is None:
-            columns = self.get_activelist_columns(resource_id)
-
-        variables = {
-            'resource_id': resource_id,
-            'columns': columns,
-            'entries': entries
-        }
-        variables.update(self.variables)  # Get the token
-
-        response = self.uri(
-            ActiveListApiEnum.ADD_ENTRIES, variables
-        )
-
-        if response.status_code() != 204:
-            raise Exception(f"(Response {response.status_code()}) "
-                            f"Could not add entries to resource ID '{resource_id}'.")
-
-    def delete_activelist_entries(self, resource_id, entries):
+        await self.__write_entries(resource_id, entries, delete=False)
 
-        # columns = self._activelist_columns.get(resource_id)
-        # if columns is None:
-        #     self.get_activelist(resource_id)  # Update columns just by querying.
-        #     columns = self._activelist_columns.get(resource_id)
+    async def delete_activelist_entries(self, resource_id, entries):
 
         if not entries:
             return
 
-        if isinstance(entries, dict):
-            columns = entries.get('_columns_order')
-        elif not isinstance(entries, str) and hasattr(entries, '__getitem__'):
-            columns = entries[0].get('_columns_order')
-        else:
-            raise TypeError(f"Illegal entries object: {entries}")
+        await self.__write_entries(resource_id, entries, delete=True)
 
-        if columns is None:
-            columns = self.get_activelist_columns(resource_id)
+    async def __write_entries(self, resource_id, entries, delete):
 
-        variables = {
-            'resource_id': resource_id,
-            'columns': columns,
-            'entries': entries
-        }
-        variables.update(self.variables)  # Get the token
+        columns = entries_columns(entries)
 
-        response = self.uri(
-            ActiveListApiEnum.DELETE_ENTRIES, variables
-        )
+        if columns is None:
+            columns = await self.get_activelist_columns(resource_id)
 
-        if response.status_code() != 204:
-            raise Exception(f"(Response {response.status_code()}) "
-                            f"Could not delete entries of resource ID '{resource_id}'.")
+        response = await self.uri(*write_entries_request(resource_id, columns, entries, delete=delete))
+        check_write_entries_response(response, resource_id, delete=delete, metadata_cache=self.__metadata_cache)
 
-    def __enter__(self):
+    async def close(self):
+        """
+        Close the HTTP session, when owned by this AsyncEsm.
+        """
+        if self.__owns_http_request_module:
+            await self.__http_request_module.close()
+
+    async def __aenter__(self):
+        await self.refresh_token()
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
         try:
-            if exc_tb:
-                raise
+            await self.logout()
         finally:
-            self.logout()
+            await self.close()
+
+
+ENTRIES_PATH = ('act.getEntriesResponse', 'act.return', 'entryList')
+COLUMNS_PATH = ('act.getEntriesResponse', 'act.return', 'columns')
+EVENTS_PATH = ('sev.getSecurityEventsResponse', 'sev.return')
 
 
-def normalized_active_list_entries(response: HttpResponse):
+def normalized_active_list_entries(response: HttpResponse, stream=False):
+    """
+    :param response: A `getEntries` response
+    :param stream: Decode the entries incrementally from `response.iter_text()` (See `siemkit.data.JsonStream`),
+     instead of parsing the whole response.
+    :return:
+    """
 
     if response.status_code() != 200:
         return
 
+    if stream:
+        yield from streamed_active_list_entries(response)
+        return
+
     response_json = response.json()
     columns = response_json['act.getEntriesResponse']['act.return']['columns']
     entry_list = response_json['act.getEntriesResponse']['act.return'].get('entryList')
@@ -477,11 +2359,54 @@ def normalized_active_list_entries(response: HttpResponse):
             yield dict_entry
 
 
-def simple_key_value(complex_cef: dict, prev_key):
+def streamed_active_list_entries(response: HttpResponse):
+    """
+    The entries of a `getEntries` response, decoded incrementally (See `normalized_active_list_entries()`).
+        Memory is bounded when `columns` precedes `entryList` (As the manager responds). Entries can't be mapped
+         before their columns, if `entryList` comes first its entries' values are held until `columns` is decoded.
+    """
+    columns = None
+    preceding_values = []  # The values of the entries before the columns, if the response is ordered so.
+
+    try:
+        for path, value in JsonStream(response.iter_text(), ENTRIES_PATH):
+
+            if path == COLUMNS_PATH:
+                columns = value
+                for values in preceding_values:
+                    dict_entry = dict(zip(columns, values))
+                    dict_entry['_columns_order'] = columns
+                    yield dict_entry
+                preceding_values.clear()
+
+            elif path == ENTRIES_PATH and value is not None:
+                if columns is None:
+                    preceding_values.append(value['entry'])
+                    continue
 
-    for key, value in complex_cef.items():
+                dict_entry = dict(zip(columns, value['entry']))
+                dict_entry['_columns_order'] = columns
+                yield dict_entry
+    finally:
+        response.close()
 
-        current_key = prev_key + key[0].upper() + key[1:]
+
+FLATTENING_PLAN_CACHE_SIZE = 4_096  # Flattening plans (nested structure shapes) kept by `flattening_plan()`.
+
+
+@lru_cache(maxsize=FLATTENING_PLAN_CACHE_SIZE)
+def flattening_plan(prev_key: str, keys: tuple) -> tuple:
+    """
+    The flattened keys of a nested structure's keys, e.g. ('source', ('address', 'port')) -> ('sourceAddress', 'sourcePort').
+        Structures (e.g. `source`, `destination` & `device`) have the same shape across events,
+         so their flattened keys are built once per shape.
+    """
+    return tuple(prev_key + key[0].upper() + key[1:] for key in keys)
+
+
+def simple_key_value(complex_cef: dict, prev_key):
+
+    for current_key, value in zip(flattening_plan(prev_key, tuple(complex_cef)), complex_cef.values()):
 
         if isinstance(value, dict):
             yield from simple_key_value(value, prev_key=current_key)
@@ -489,25 +2414,51 @@ def simple_key_value(complex_cef: dict, prev_key):
             yield current_key, value
 
 
+def flatten_into(simple_cef: dict, complex_cef: dict, prev_key):
+    """
+    `simple_key_value()` without the generators, writing into `simple_cef`.
+    """
+    for current_key, value in zip(flattening_plan(prev_key, tuple(complex_cef)), complex_cef.values()):
+
+        if isinstance(value, dict):
+            flatten_into(simple_cef, value, current_key)
+        else:
+            simple_cef[current_key] = value
+
+
 def simplify_cef(complex_cef: dict):
 
     simple_cef = {}
 
     for key, item in complex_cef.items():
         if isinstance(item, dict):
-            for simple_key, simple_value in simple_key_value(item, key):
-                simple_cef[simple_key] = simple_value
+            flatten_into(simple_cef, item, key)
         else:
             simple_cef[key] = item
 
     return simple_cef
 
 
-def simplified_cef_events(response: HttpResponse):
+def simplified_cef_events(response: HttpResponse, stream=False):
+    """
+    :param response: A `getSecurityEvents` response
+    :param stream: Decode the events incrementally from `response.iter_text()` (See `siemkit.data.JsonStream`),
+     instead of parsing the whole response.
+    :return:
+    """
 
     if response.status_code() != 200:
         return
 
+    if stream:
+        try:
+            for path, value in JsonStream(response.iter_text(), EVENTS_PATH):
+                if path == EVENTS_PATH and value is not None:
+                    yield simplify_cef(value)
+        finally:
+            response.close()
+        return
+
     response_json = response.json()
 
     sev_get_security_events_response = response_json.get('sev.getSecurityEventsResponse')
@@ -0,0 +1,495 @@
+#   Copyright (C) 2020 CyberSIEM(R)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Performance benchmarks.
+
+    Run all benchmarks:
+        python -m siemkit.benchmark
+
+    Run selected benchmarks:
+        python -m siemkit.benchmark random_event
+
+    The `import_time` benchmark fails (raises) when a module exceeds its `IMPORT_TIME_BUDGETS`.
+"""
+
+import os
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+from typing import Callable
+
+
+IMPORT_TIME_BUDGETS = {  # Milliseconds of a module's cumulative import time (`python -X importtime`).
+    'siemkit.send': 25,
+    'siemkit.net': 40,
+    'siemkit.parse': 75,
+    'siemkit.event': 100,
+    'siemkit.arcsight': 50
+}
+
+
+def measure(function: Callable, number: int = 1, repeat: int = 5) -> float:
+    """
+    Measure the best time of a function call, in seconds per call.
+    :param function: A function with no parameters
+    :param number: Calls per measurement
+    :param repeat: Measurements to take the best of
+    :return:
+    """
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def report(title: str, results: dict, file=None):
+
+    if file is None:
+        file = sys.stdout
+
+    print(title, file=file)
+    for name, value in results.items():
+        if isinstance(value, float):
+            value = f"{value:.2f}"
+        print(f"    {name:<48} {value}", file=file)
+
+
+def random_event(amount: int = 10_000) -> dict:
+    """
+    Compare the per-event `process_random_value()` dispatch with the precompiled `RandomFieldPlan`,
+     for a 20 fields random event.
+
+    :param amount: Amount of events per measurement
+    :return: Microseconds per event of each method
+    """
+
+    from siemkit import random
+    from siemkit.simulate import cef
+
+    fields = {
+        'sourceAddress': random.ip,
+        'destinationAddress': (random.ip, {'from_address': '192.168.0.1', 'to_address': '192.168.0.254'}),
+        'sourcePort': random.port,
+        'destinationPort': (random.port, {'from_port': 1, 'to_port': 1024}),
+        'sourceUserName': random.user,
+        'destinationUserName': ('admin', 'root', 'guest', 'service'),
+        'requestUrl': random.url,
+        'fileHash': random.md5,
+        'deviceCustomString1': random.sha1,
+        'deviceCustomString1Label': 'SHA1',
+        'deviceCustomNumber1': (1, 2, 3, 4, 5),
+        'deviceCustomNumber1Label': 'Risk',
+        'deviceHostName': random.domain,
+        'sourceHostName': random.domain,
+        'message': ('Login', 'Logout', 'Failed Login', (random.email, {})),
+        'deviceAction': ('allow', 'deny'),
+        'transportProtocol': ('TCP', 'UDP'),
+        'applicationProtocol': 'HTTP',
+        'deviceEventCategory': '/Authentication',
+        'bytesIn': random.http_code
+    }
+
+    amount_range = range(amount)
+    process_random_value = cef.process_random_value
+    fields_items = tuple(fields.items())
+
+    def dispatch():
+        for _ in amount_range:
+            {key: process_random_value(value) for key, value in fields_items}
+
+    plan = cef.RandomFieldPlan(fields)
+
+    def compiled():
+        for _ in amount_range:
+            plan()
+
+    def events():
+        for _ in cef.random_event(amount=amount, **fields):
+            pass
+
+    results = {
+        'process_random_value() [us/event]': measure(dispatch, repeat=3) / amount * 1e6,
+        'RandomFieldPlan() [us/event]': measure(compiled, repeat=3) / amount * 1e6,
+        'random_event() [us/event]': measure(events, repeat=3) / amount * 1e6
+    }
+
+    report(f"Random event of {len(fields)} fields ({amount} events)", results)
+
+    return results
+
+
+def measure_memory(factory: Callable, amount: int = 1_000) -> float:
+    """
+    Measure the memory allocated per object, in bytes.
+    :param factory: A function with no parameters, creating the object
+    :param amount: Amount of objects to create
+    :return:
+    """
+    tracemalloc.start()
+    try:
+        objects = [factory() for _ in range(amount)]
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    del objects
+    return size / amount
+
+
+def event_memory(amount: int = 1_000) -> dict:
+    """
+    Compare the memory of in-flight `Cef` events with `CompactEvent` events, for a 10 fields event.
+
+    :param amount: Amount of events to hold
+    :return: Bytes per event of each representation
+    """
+
+    from siemkit.event import Cef
+    from siemkit.event import CompactEvent
+
+    fields = {
+        'sourceAddress': '10.0.0.1',
+        'destinationAddress': '10.0.0.2',
+        'sourcePort': 50123,
+        'destinationPort': 443,
+        'sourceUserName': 'user',
+        'destinationUserName': 'admin',
+        'message': 'Login',
+        'deviceAction': 'allow',
+        'deviceEventCategory': '/Authentication',
+        'deviceCustomNumber1': 1
+    }
+
+    schema = Cef.schema()
+
+    results = {
+        'Cef [bytes/event]': measure_memory(lambda: Cef(data=fields), amount=amount),
+        'CompactEvent [bytes/event]': measure_memory(lambda: CompactEvent(schema, fields), amount=amount)
+    }
+
+    report(f"Event memory of {len(fields)} fields ({amount} events)", results)
+
+    return results
+
+
+def cef_construction(amount: int = 10_000) -> dict:
+    """
+    Measure the construction of `Cef` events, with the default aliases (shared prototype)
+     and with custom aliases (resolved per event).
+
+    :param amount: Amount of events per measurement
+    :return: Microseconds per event of each construction
+    """
+
+    from siemkit.event import Cef
+
+    data = {
+        'sourceAddress': '10.0.0.1',
+        'destinationAddress': '10.0.0.2',
+        'message': 'Login'
+    }
+    aliases = {'attackerAddress': 'sourceAddress'}
+
+    results = {
+        'Cef() [us/event]': measure(Cef, number=amount, repeat=3) * 1e6,
+        'Cef(data=...) [us/event]': measure(lambda: Cef(data=data), number=amount, repeat=3) * 1e6,
+        'Cef(aliases=...) [us/event]': measure(lambda: Cef(aliases=aliases), number=amount // 10, repeat=3) * 1e6
+    }
+
+    report(f"Cef construction ({amount} events)", results)
+
+    return results
+
+
+def timestamp_conversion(amount: int = 10_000) -> dict:
+    """
+    Compare per-datetime `from_datetime()` & `to_datetime()` calls with the batch
+     `from_datetimes()` & `to_datetimes()` methods, of every `TimeType`.
+
+    :param amount: Amount of datetimes per measurement
+    :return: Microseconds per datetime of each conversion
+    """
+
+    from datetime import datetime
+    from datetime import timedelta
+    from siemkit.time import TimeType
+
+    start = datetime(2020, 1, 1)
+    datetimes = [start + timedelta(seconds=index * 7_919) for index in range(amount)]
+
+    results = {}
+    for type_ in TimeType:
+        timestamp_class = type_.value
+        timestamps = type_.from_datetimes(datetimes)
+
+        results[f'{type_.name} from_datetime() [us/datetime]'] = measure(
+            lambda: [timestamp_class.from_datetime(datetime_) for datetime_ in datetimes], repeat=3
+        ) / amount * 1e6
+        results[f'{type_.name} from_datetimes() [us/datetime]'] = measure(
+            lambda: type_.from_datetimes(datetimes), repeat=3
+        ) / amount * 1e6
+        results[f'{type_.name} to_datetime() [us/datetime]'] = measure(
+            lambda: [timestamp_class.to_datetime(timestamp) for timestamp in timestamps], repeat=3
+        ) / amount * 1e6
+        results[f'{type_.name} to_datetimes() [us/datetime]'] = measure(
+            lambda: type_.to_datetimes(timestamps), repeat=3
+        ) / amount * 1e6
+
+    report(f"Timestamp conversion ({amount} datetimes)", results)
+
+    return results
+
+
+def time_parsing(amount: int = 10_000) -> dict:
+    """
+    Compare `parse.time()` (format inference) with `dateparser.parse()`, for the known time formats.
+
+    :param amount: Amount of time strings per measurement (`dateparser` parses 1% of it)
+    :return: Microseconds per time string of each parser
+    """
+
+    import dateparser
+    from siemkit import parse
+
+    samples = {
+        'epoch_millis': '1603108800123',
+        'iso8601': '2020-10-19T12:00:00.123+02:00',
+        'syslog': 'Oct 19 12:00:00',
+        'arcsight': 'Oct 19 2020 12:00:00'
+    }
+
+    results = {}
+    for name, sample in samples.items():
+        strings = [sample] * amount
+        sample_strings = strings[:max(amount // 100, 1)]
+
+        results[f'{name} parse.time() [us/string]'] = measure(
+            lambda: [parse.time(string, stream=name) for string in strings], repeat=3
+        ) / amount * 1e6
+        results[f'{name} dateparser.parse() [us/string]'] = measure(
+            lambda: [dateparser.parse(string) for string in sample_strings], repeat=1
+        ) / len(sample_strings) * 1e6
+
+    report(f"Time parsing ({amount} strings)", results)
+
+    return results
+
+
+def cef_flattening(amount: int = 10_000) -> dict:
+    """
+    Measure `arcsight.simplify_cef()` of ESM security events (nested `source`, `destination`, `device`, etc.),
+     flattened by the cached plans of their structures.
+
+    :param amount: Amount of events per measurement
+    :return: Microseconds per event
+    """
+
+    from siemkit import arcsight
+
+    def security_event(event_id):
+        return {
+            'eventId': event_id,
+            'type': 'BASE',
+            'name': 'Login',
+            'startTime': 1603108800000,
+            'priority': 5,
+            'source': {
+                'address': f'10.0.0.{event_id % 250}',
+                'port': 50000 + event_id % 1000,
+                'userName': 'user',
+                'geo': {'latitude': 32.0, 'longitude': 34.8, 'countryCode': 'IL'}
+            },
+            'destination': {
+                'address': '10.0.1.1',
+                'port': 443,
+                'userName': 'admin',
+                'geo': {'latitude': 40.7, 'longitude': -74.0, 'countryCode': 'US'}
+            },
+            'device': {'address': '10.0.2.1', 'hostName': 'firewall', 'vendor': 'Vendor', 'product': 'Product'},
+            'agent': {'address': '10.0.3.1', 'type': 'syslog', 'zone': {'id': 'zone', 'uri': '/All Zones'}},
+            'category': {'behavior': '/Authentication', 'outcome': '/Success', 'significance': '/Normal'}
+        }
+
+    events = [security_event(event_id) for event_id in range(amount)]
+    simplify_cef = arcsight.simplify_cef
+
+    results = {
+        f'simplify_cef() {len(simplify_cef(events[0]))} fields [us/event]': measure(
+            lambda: [simplify_cef(event) for event in events], repeat=3
+        ) / amount * 1e6
+    }
+
+    report(f"CEF flattening ({amount} events)", results)
+
+    return results
+
+
+def arcsight_api(events: int = 200, entries: int = 100_000, latency: float = 0.002) -> dict:
+    """
+    Measure `arcsight.Esm` against a local mock manager (`simulate.arcsight.MockEsm`) - requests,
+     latency & throughput of event retrieval and active list operations.
+
+    :param events: Correlation events to retrieve (With 10 base events each)
+    :param entries: Active list entries to write & read
+    :param latency: Seconds added by the mock to every request
+    :return: Results of each operation
+    """
+
+    from time import perf_counter
+    from siemkit.arcsight import Esm
+    from siemkit.simulate.arcsight import MockEsm
+
+    results = {}
+
+    with MockEsm(latency=latency, correlation_events=events, base_events=10) as mock:
+        mock.add_activelist('benchmark', ['user', 'group', 'seen'], key_fields=['user'])
+
+        esm = Esm(mock.host, mock.port, mock.username, mock.password, scheme='http')
+
+        def run(name, function, amount, unit):
+            mock.reset_counters()
+            start = perf_counter()
+            function()
+            seconds = perf_counter() - start
+
+            results[f'{name} [requests]'] = sum(mock.requests.values())
+            results[f'{name} [ms]'] = seconds * 1e3
+            results[f'{name} [{unit}/s]'] = amount / seconds
+
+        event_ids = range(1, events + 1)
+        for max_workers in (1, 4):
+            run(
+                f'retrieve_event_ids(max_workers={max_workers})',
+                lambda: list(esm.retrieve_event_ids(event_ids, sub_events=True, max_workers=max_workers)),
+                events * 11,
+                'events'
+            )
+
+        rows = [{'user': f'user{index}', 'group': f'group{index % 10}', 'seen': '1'} for index in range(entries)]
+        run(
+            'bulk_write_activelist_entries()',
+            lambda: list(esm.bulk_write_activelist_entries('benchmark', rows)),
+            entries,
+            'entries'
+        )
+
+        run('get_activelist()', lambda: esm.get_activelist('benchmark'), entries, 'entries')
+        run(
+            'get_activelist(stream=True)',
+            lambda: sum(1 for _ in esm.get_activelist('benchmark', stream=True)),
+            entries,
+            'entries'
+        )
+
+        writes = 100
+
+        def single_writes():
+            for row in rows[:writes]:
+                esm.add_activelist_entries('benchmark', row)
+
+        run('add_activelist_entries() x100', single_writes, writes, 'writes')
+
+        esm.logout()
+        esm.close()
+
+    report(f"ArcSight API - mock manager ({latency * 1e3:g}ms latency)", results)
+
+    return results
+
+
+def measure_import_time(module: str, repeat: int = 3) -> float:
+    """
+    Measure the best cumulative import time of a module in a new interpreter, in milliseconds.
+    :param module: Module name
+    :param repeat: Interpreters to take the best of
+    :return:
+    """
+    environment = dict(os.environ)
+    package_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment['PYTHONPATH'] = os.pathsep.join(
+        path for path in (package_path, environment.get('PYTHONPATH')) if path
+    )
+
+    timings = []
+    for _ in range(repeat):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True,
+            text=True,
+            env=environment
+        )
+        if process.returncode != 0:
+            raise Exception(f"Failed importing '{module}': {process.stderr.strip().splitlines()[-1:]}")
+
+        for line in process.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == module:
+                timings.append(int(fields[1]) / 1_000)
+                break
+
+    return min(timings)
+
+
+def import_time(repeat: int = 3) -> dict:
+    """
+    Measure the import time of the modules in `IMPORT_TIME_BUDGETS`, failing when a module exceeds its budget.
+
+    :param repeat: Interpreters per module
+    :return: Milliseconds of each module
+    """
+
+    results = {
+        f'{module} [ms]': measure_import_time(module, repeat=repeat)
+        for module in IMPORT_TIME_BUDGETS
+    }
+
+    report(f"Import time (best of {repeat} interpreters)", results)
+
+    exceeded = [
+        f"{module} {results[f'{module} [ms]']:.2f}ms > {budget}ms"
+        for module, budget in IMPORT_TIME_BUDGETS.items()
+        if results[f'{module} [ms]'] > budget
+    ]
+    if exceeded:
+        raise Exception(f"Import time budget exceeded: {', '.join(exceeded)}")
+
+    return results
+
+
+benchmarks = {
+    'random_event': random_event,
+    'event_memory': event_memory,
+    'cef_construction': cef_construction,
+    'timestamp_conversion': timestamp_conversion,
+    'time_parsing': time_parsing,
+    'cef_flattening': cef_flattening,
+    'arcsight_api': arcsight_api,
+    'import_time': import_time
+}
+
+
+def main(names=None) -> int:
+
+    if not names:
+        names = tuple(benchmarks)
+
+    for name in names:
+        benchmarks[name]()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
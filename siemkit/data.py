@@ -160,6 +160,102 @@ class IDTracker:
         return str(self.__data)
 
 
+class HighWaterMarkTracker:
+    """
+    Durable high-water marks by key (e.g. an LDAP domain) - the highest values seen of ordered fields,
+     e.g. {'usn': 123456, 'time': '20201019120000.0Z'}. Marks only move forward.
+        Saved atomically (A temporary file replaces the tracker file), a crash leaves the last saved marks.
+    """
+
+    def __init__(self, file_name):
+
+        self.__file_name = file_name
+
+        self.__data = {}
+
+        self.__update = True
+
+        if os.path.exists(self.__file_name):
+            self.load()
+        else:
+            path = os.path.dirname(self.__file_name)
+            if path:
+                if not os.path.exists(path):
+                    os.makedirs(path)
+            self.save()
+
+    def mark(self, key) -> dict:
+        """
+        :return: The marks of a key (Empty if none)
+        """
+        return dict(self.__data.get(key, {}))
+
+    def advance(self, key, **marks) -> bool:
+        """
+        Raise the marks of a key, e.g. `tracker.advance(domain, usn=123456, time='20201019120000.0Z')`.
+            Lower (or None) values are ignored. Values of a field must be comparable (e.g. fixed width times).
+        :return: True if any mark moved
+        """
+        current = self.__data.setdefault(key, {})
+        moved = False
+
+        for field, value in marks.items():
+            if value is None:
+                continue
+            if field not in current or value > current[field]:
+                current[field] = value
+                moved = True
+
+        if moved:
+            self.__update = True
+
+        return moved
+
+    def reset(self, key=None):
+        """
+        :param key: None - Reset all keys.
+        """
+        if key is None:
+            self.__data.clear()
+        else:
+            self.__data.pop(key, None)
+        self.__update = True
+
+    def save(self):
+        if self.__update:
+            temporary_file_name = f"{self.__file_name}.tmp"
+            with open(temporary_file_name, 'w', encoding='utf-8') as fs:
+                json.dump(self.__data, fs)
+                fs.flush()
+                os.fsync(fs.fileno())
+            os.replace(temporary_file_name, self.__file_name)
+            self.__update = False
+            return True
+        return False
+
+    def load(self):
+        with open(self.__file_name, 'r', encoding='utf-8') as fs:
+            self.__data = json.load(fs)
+
+        self.__update = False
+        return self.__data
+
+    def __contains__(self, key):
+        return key in self.__data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_tb:
+            raise
+
+        self.save()
+
+    def __str__(self):
+        return str(self.__data)
+
+
 class JsonFile(dict):
 
     def __init__(self, file_name, *args, auto_commit=False, indent=4, **kwargs):
@@ -196,6 +292,169 @@ class JsonFile(dict):
         return self
 
 
+class JsonStream:
+    """
+    An incremental JSON decoder of text chunks (e.g. a streamed HTTP response), with bounded memory:
+        Descends the objects along `path` and yields the items of the array at `path` as they're decoded,
+         without holding the whole document. Every other value along the way is decoded completely.
+
+        e.g.
+            for path, value in JsonStream(response.iter_text(), ('act.getEntriesResponse', 'act.return', 'entryList')):
+                if path == ('act.getEntriesResponse', 'act.return', 'columns'):
+                    columns = value
+                else:
+                    ...  # An entry of `entryList`
+
+    Yields (path, value) events:
+        - (path, item) for each item of the array at `path`, or (path, value) when it's not an array.
+        - (key path, value) for the other members of the objects along `path`.
+
+    `found` tells whether `path` was found, once the stream was consumed.
+    """
+
+    __decoder = json.JSONDecoder()
+    __whitespace = ' \t\n\r'
+    __number = '0123456789.eE+-'
+
+    def __init__(self, chunks: Iterable, path: tuple = ()):
+        """
+        :param chunks: Iterable of JSON text chunks (str)
+        :param path: Keys of the yielded array
+        """
+        self.__chunks = iter(chunks)
+        self.__path = tuple(path)
+        self.__buffer = ''
+        self.__position = 0
+        self.__exhausted = False
+        self.found = False
+
+    def __iter__(self) -> Generator[Tuple[tuple, object], None, None]:
+        yield from self.__value(())
+
+        if self.__peek(required=False) is not None:
+            raise ValueError(f"Extra data at position {self.__position} of the JSON stream.")
+
+    def __read(self, size: int = 1) -> bool:
+        """
+        Read chunks until at least `size` more characters are buffered.
+        :return: False if the stream is exhausted.
+        """
+        buffer = [self.__buffer[self.__position:]]
+        read = 0
+
+        while read < size:
+            chunk = next(self.__chunks, None)
+            if chunk is None:
+                self.__exhausted = True
+                break
+            buffer.append(chunk)
+            read += len(chunk)
+
+        self.__buffer = ''.join(buffer)
+        self.__position = 0
+
+        return read > 0
+
+    def __peek(self, required=True):
+        """
+        :return: The next non whitespace character (Not consumed), None at the end of the stream.
+        """
+        while True:
+            buffer = self.__buffer
+            position = self.__position
+            length = len(buffer)
+
+            while position < length and buffer[position] in self.__whitespace:
+                position += 1
+
+            self.__position = position
+
+            if position < length:
+                return buffer[position]
+
+            if not self.__read():
+                if required:
+                    raise ValueError("Unexpected end of the JSON stream.")
+                return None
+
+    def __expect(self, characters: str) -> str:
+        character = self.__peek()
+        if character not in characters:
+            raise ValueError(f"Expected one of '{characters}' at position {self.__position} "
+                             f"of the JSON stream, got '{character}'.")
+        self.__position += 1
+        return character
+
+    def __decode(self):
+        """
+        Decode the next complete value, reading more chunks as needed.
+        """
+        self.__peek()
+
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(self.__buffer, self.__position)
+            except json.JSONDecodeError:
+                if self.__exhausted or not self.__read(len(self.__buffer) - self.__position):
+                    raise
+                continue
+
+            # A number may continue in the next chunk (e.g. '3.' + '25', '2.5e' + '10').
+            if (not self.__exhausted and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and not self.__buffer[end:].strip(self.__number)):
+                if self.__read(len(self.__buffer) - self.__position):
+                    continue
+
+            self.__position = end
+            return value
+
+    def __value(self, path: tuple) -> Generator[Tuple[tuple, object], None, None]:
+
+        depth = len(path)
+        target = depth == len(self.__path)
+        character = self.__peek()
+
+        if target:
+            self.found = True
+
+            if character != '[':
+                yield path, self.__decode()
+                return
+
+            self.__position += 1
+            if self.__peek() == ']':
+                self.__position += 1
+                return
+
+            while True:
+                yield path, self.__decode()
+                if self.__expect(',]') == ']':
+                    return
+
+        if character != '{':
+            yield path, self.__decode()
+            return
+
+        self.__position += 1
+        if self.__peek() == '}':
+            self.__position += 1
+            return
+
+        while True:
+            if self.__peek() != '"':
+                raise ValueError(f"Expected a key at position {self.__position} of the JSON stream.")
+            key = self.__decode()
+            self.__expect(':')
+
+            if key == self.__path[depth]:
+                yield from self.__value(path + (key,))
+            else:
+                yield path + (key,), self.__decode()
+
+            if self.__expect(',}') == '}':
+                return
+
+
 class RamKeyring(adaptors.Keyring):
 
     def __init__(self):
@@ -15,13 +15,19 @@
 # import logging
 import sys
 import re
+import socket
+import threading
 import timeit
 
 import json
 
 from collections import deque
+from copy import deepcopy
+from datetime import datetime
 from enum import Enum
 from ipaddress import IPv4Address
+from time import time
+from types import MappingProxyType
 
 
 from . import data as siemkit_data
@@ -85,7 +91,7 @@ def smart_value(key, value):
         #         return parse.time(value)
         # else:
         #     return value
-        return parse.time(str(value))
+        return parse.time(str(value), stream=key)
 
 
 class CefSeverity(str, Enum):
@@ -100,6 +106,174 @@ class CefSeverity(str, Enum):
         return self.value
 
 
+class SyslogLayout(str, Enum):
+
+    LEGACY = 'legacy'
+    RFC3164 = 'rfc3164'
+    RFC5424 = 'rfc5424'
+
+    def __str__(self):
+        return self.value
+
+
+class SyslogHeader:
+    """
+    Syslog header provider.
+
+    The host identity (FQDN & IP address) is resolved once, then refreshed by a background thread,
+     so building a header never waits on DNS. The header is rebuilt at most once per second.
+
+    Layouts:
+        legacy:  'Oct 19 12:00:00 10.0.0.1 host.example.com' (The original `EventFormat.syslog_header()`)
+        rfc3164: '<14>Oct  9 12:00:00 host siemkit: '
+        rfc5424: '<14>1 2020-10-19T12:00:00+00:00 host.example.com siemkit - - - '
+    """
+
+    __default = None
+
+    @classmethod
+    def default(cls):
+        """
+        The shared provider used by `EventFormat.syslog_header()`.
+        """
+        if cls.__default is None:
+            cls.__default = cls()
+        return cls.__default
+
+    def __init__(
+            self,
+            layout=SyslogLayout.LEGACY,
+            hostname=None,
+            ip_address=None,
+            refresh_interval=300,
+            time_format="%b %d %H:%M:%S",
+            facility=1,
+            severity=6,
+            app_name='siemkit',
+            process_id=None,
+            message_id=None
+    ):
+        """
+        :param layout: A SyslogLayout (or its name)
+        :param hostname: Fixed fully qualified host name (Skips resolving)
+        :param ip_address: Fixed IP address (Skips resolving)
+        :param refresh_interval: Seconds between host identity refreshes. None/0 - Never refresh.
+        :param time_format: Timestamp format of the legacy layout
+        :param facility: Syslog facility (RFC layouts)
+        :param severity: Syslog severity (RFC layouts)
+        :param app_name: Application name / tag (RFC layouts)
+        :param process_id: Process ID (RFC 5424)
+        :param message_id: Message ID (RFC 5424)
+        """
+        self.__layout = SyslogLayout(layout)
+        self.__hostname = hostname
+        self.__ip_address = ip_address
+        self.__refresh_interval = refresh_interval
+        self.__time_format = time_format
+        self.__priority = f"<{facility * 8 + severity}>"
+        self.__app_name = app_name or '-'
+        self.__process_id = '-' if process_id is None else str(process_id)
+        self.__message_id = message_id or '-'
+
+        self.__identity = None
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+        self.__second = None
+        self.__header = None
+
+    def __resolve(self):
+        fully_qualified_name = self.__hostname
+        if fully_qualified_name is None:
+            fully_qualified_name = socket.getfqdn()
+
+        ip_address = self.__ip_address
+        if ip_address is None:
+            ip_address = socket.gethostbyname(fully_qualified_name)
+
+        return fully_qualified_name, ip_address
+
+    def __refresh(self):
+        while not self.__stopped.wait(self.__refresh_interval):
+            try:
+                identity = self.__resolve()
+            except OSError:
+                continue  # Keep the last known identity.
+
+            if identity != self.__identity:
+                self.__identity = identity
+                self.__second = None
+
+    def identity(self):
+        """
+        :return: The host identity - (fully qualified name, ip address)
+        """
+        if self.__identity is None:
+            with self.__lock:
+                if self.__identity is None:
+                    self.__identity = self.__resolve()
+                    fixed = self.__hostname is not None and self.__ip_address is not None
+                    if self.__refresh_interval and not fixed:
+                        self.__thread = threading.Thread(
+                            target=self.__refresh,
+                            name='siemkit-syslog-header',
+                            daemon=True
+                        )
+                        self.__thread.start()
+
+        return self.__identity
+
+    def format(self, second, time_format=None):
+        """
+        Build the header of a specific second.
+        :param second: Epoch seconds
+        :param time_format: Timestamp format of the legacy layout (Default - The provider's format)
+        :return:
+        """
+        fully_qualified_name, ip_address = self.identity()
+        date_time = datetime.fromtimestamp(second)
+
+        if self.__layout is SyslogLayout.RFC5424:
+            return (
+                f"{self.__priority}1 {date_time.astimezone().isoformat(timespec='seconds')} "
+                f"{fully_qualified_name} {self.__app_name} {self.__process_id} {self.__message_id} - "
+            )
+
+        if self.__layout is SyslogLayout.RFC3164:
+            hostname = fully_qualified_name.split('.', 1)[0]
+            return (
+                f"{self.__priority}{date_time:%b} {date_time.day:>2} {date_time:%H:%M:%S} "
+                f"{hostname} {self.__app_name}: "
+            )
+
+        if time_format is None:
+            time_format = self.__time_format
+        return f"{date_time.strftime(time_format)} {ip_address} {fully_qualified_name}"
+
+    def __call__(self, time_format=None):
+        """
+        :param time_format: Timestamp format of the legacy layout (Other than the provider's format isn't cached)
+        :return: The header of the current second
+        """
+        second = int(time())
+
+        if time_format is not None and time_format != self.__time_format:
+            return self.format(second, time_format)
+
+        if second != self.__second:
+            self.__header = self.format(second)
+            self.__second = second
+
+        return self.__header
+
+    def close(self):
+        """
+        Stop refreshing the host identity.
+        """
+        self.__stopped.set()
+
+
 def filter_fields(events, allowed_fields):
     """
     Filter fields that are not within the `allowed_fields` argument. Yielding events with discarded unknown fields.
@@ -221,12 +395,8 @@ class EventFormat(dict):
 
     @staticmethod
     def syslog_header(time_format="%b %d %H:%M:%S"):
-        import socket
-        from datetime import datetime
-        fully_qualified_name = socket.getfqdn()
-        ip_address = socket.gethostbyname(fully_qualified_name)
-        return f"{datetime.now().strftime(time_format)} {ip_address} {fully_qualified_name}"
-        # return format_.format(datetime.now(), ip_address, fully_qualified_name)
+        # Host identity is resolved once & refreshed in the background (see SyslogHeader).
+        return SyslogHeader.default()(time_format)
 
     @staticmethod
     def serializer(headers, data):
@@ -347,7 +517,8 @@ class EventFormat(dict):
             size_limit=1024,
             optimized_state_levels=5,
             filter_out=None,
-            filter_in=None
+            filter_in=None,
+            aliases_declared=False
     ):
 
         """
@@ -376,6 +547,7 @@ class EventFormat(dict):
             udp                 - UDP IP:Port address or collection of addresses to send events to over UDP protocol
             file                - File path to output an events file
             size_limit          - The event size limit. In order to avoid potential size exploits.
+            aliases_declared    - The `fields` declaration already contains all the alias names & targets
         """
 
         super().__init__()
@@ -441,7 +613,8 @@ class EventFormat(dict):
         self.__headers_hash_set = set(headers)  # Much faster to test against.
         self.__aliases = aliases
         self.__fields = fields
-        self.__fields.update(siemkit_data.words_set(aliases))
+        if not aliases_declared:
+            self.__fields.update(siemkit_data.words_set(aliases))
 
         # self.__headers_set = set(headers)
 
@@ -463,8 +636,17 @@ class EventFormat(dict):
         self.__output = None
         self.output(outputs)
 
+    def format_version(self):
+        """
+        :return: Format name & version. e.g. ('CEF', 0)
+        """
+        return self.__format, self.__version
+
     def update_aliases(self, aliases):
-        EventFormat.__aliases[id(self)].update(aliases)
+        # Copy on write: the current aliases may be shared by other events (see `Cef.prototype()`)
+        updated_aliases = dict(EventFormat.__aliases[id(self)])
+        updated_aliases.update(aliases)
+        EventFormat.__aliases[id(self)] = updated_aliases
         return self
 
     def assign_aliases(self, aliases):
@@ -691,10 +873,259 @@ class EventFormat(dict):
 
     def available_keys(self):
 
-        self.__fields.update(self.keys())
+        # Copy on write: the fields declaration may be shared by other events (see `Cef.prototype()`)
+        self.__fields = self.__fields.union(self.keys())
         return set(self.__fields)
 
 
+class EventSchema:
+    """
+    A field layout shared by compact events of the same format.
+        Every field gets an ordinal, which indexes the values of a `CompactEvent`.
+        Fields (other than the headers & defaults) are assigned ordinals on first use, aliases resolve to their field's ordinal.
+         An event's values list only grows up to the highest ordinal it uses.
+    """
+
+    __slots__ = (
+        'format_version',
+        'headers',
+        'serializer',
+        'aliases',
+        'names',
+        'ordinals',
+        'defaults'
+    )
+
+    def __init__(self, format_, version, headers, aliases=None, defaults=None, serializer=None):
+
+        if aliases is None:
+            aliases = {}
+
+        if defaults is None:
+            defaults = {}
+
+        if serializer is None:
+            serializer = EventFormat.serializer
+
+        self.format_version = bytes("{}:{}|".format(format_, version), 'utf-8')
+        self.headers = tuple(headers)
+        self.serializer = serializer
+        self.aliases = dict(aliases)  # Alias -> field name
+        self.names = []  # Ordinal -> field name
+        self.ordinals = {}  # Field name or used alias -> ordinal
+
+        for header in self.headers:
+            self.ordinal(header)
+
+        values = []
+        for key, value in defaults.items():
+            ordinal = self.ordinal(key)
+            values.extend([None] * (ordinal + 1 - len(values)))
+            values[ordinal] = value
+
+        self.defaults = tuple(values)
+
+    def lookup(self, key):
+        """
+        :return: The ordinal of a field or alias, None if it was never used.
+        """
+
+        ordinal = self.ordinals.get(key)
+
+        if ordinal is None and key in self.aliases:
+            ordinal = self.ordinals.get(self.aliases[key])
+            if ordinal is not None:
+                self.ordinals[key] = ordinal
+
+        return ordinal
+
+    def ordinal(self, key) -> int:
+        """
+        :return: The ordinal of a field or alias, assigned on first use.
+        """
+
+        ordinal = self.lookup(key)
+
+        if ordinal is None:
+            name = self.aliases.get(key, key)
+            ordinal = self.ordinals.get(name)
+
+            if ordinal is None:
+                ordinal = len(self.names)
+                self.names.append(name)
+                self.ordinals[name] = ordinal
+
+            self.ordinals[key] = ordinal
+
+        return ordinal
+
+
+class CompactEvent:
+    """
+    A compact, schema bound event.
+        Holds only a reference to a shared `EventSchema`, a list of values indexed by field ordinals & the fields order,
+         instead of a dictionary & the per instance states, aliases & outputs of an `EventFormat`.
+        Use it for buffering many in-flight events. e.g. `Cef().compact()`
+        Notice: None marks an unset field, so fields can't hold None (Setting None removes the field).
+        Attributes are the schema's fields & aliases (Other names raise AttributeError). Supports `copy` & `pickle`.
+
+        event = CompactEvent(Cef.schema())
+        event.sourceAddress = '127.0.0.1'
+        event['dst'] = '127.0.0.2'
+        bytes(event)
+    """
+
+    __slots__ = ('schema', 'values', 'order')
+
+    def __init__(self, schema: EventSchema, data=None):
+
+        object.__setattr__(self, 'schema', schema)
+        object.__setattr__(self, 'values', list(schema.defaults))
+        object.__setattr__(self, 'order', [ordinal for ordinal, value in enumerate(self.values) if value is not None])
+
+        if data:
+            self.update(data)
+
+    def __getitem__(self, key):
+
+        ordinal = self.schema.lookup(key)
+
+        if ordinal is not None and ordinal < len(self.values):
+            value = self.values[ordinal]
+            if value is not None:
+                return value
+
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+
+        if value is None:
+            if key in self:
+                del self[key]
+            return
+
+        ordinal = self.schema.ordinal(key)
+        values = self.values
+
+        if ordinal >= len(values):
+            values.extend([None] * (ordinal + 1 - len(values)))
+
+        if values[ordinal] is None:
+            self.order.append(ordinal)  # Insertion order, like a dictionary.
+
+        values[ordinal] = value
+
+    def __delitem__(self, key):
+
+        ordinal = self.schema.lookup(key)
+
+        if ordinal is None or ordinal >= len(self.values) or self.values[ordinal] is None:
+            raise KeyError(key)
+
+        self.values[ordinal] = None
+        self.order.remove(ordinal)
+
+    def __getattr__(self, name):
+
+        # Dunder & private names (e.g. `__deepcopy__`, looked up by `copy` & `pickle`) are never fields.
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        # If attribute has double underscores, treat as a single space.
+        if '__' in name:
+            name = name.replace('__', ' ')
+
+        schema = self.schema
+        if schema.lookup(name) is None and name not in schema.aliases:
+            raise AttributeError(name)
+
+        return self.get(name)
+
+    def __setattr__(self, name, value):
+
+        # If attribute has double underscores, treat as a single space.
+        if '__' in name:
+            name = name.replace('__', ' ')
+
+        self[name] = value
+
+    def __getstate__(self):
+        return self.schema, self.values, self.order
+
+    def __setstate__(self, state):
+        schema, values, order = state
+        object.__setattr__(self, 'schema', schema)
+        object.__setattr__(self, 'values', values)
+        object.__setattr__(self, 'order', order)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        # The schema is shared, not copied.
+        event = CompactEvent.__new__(CompactEvent)
+        event.__setstate__((self.schema, deepcopy(self.values, memo), list(self.order)))
+        return event
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return (key for key, _ in self.items())
+
+    def __eq__(self, other):
+        if isinstance(other, CompactEvent):
+            return self.to_dict() == other.to_dict()
+        return self.to_dict() == other
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def update(self, d, **f):
+
+        for key, value in d.items():
+            self[key] = value
+
+        for key, value in f.items():
+            self[key] = value
+
+        return self
+
+    def items(self):
+        names = self.schema.names
+        values = self.values
+        return ((names[ordinal], values[ordinal]) for ordinal in self.order)
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def copy(self):
+        event = CompactEvent.__new__(CompactEvent)
+        object.__setattr__(event, 'schema', self.schema)
+        object.__setattr__(event, 'values', list(self.values))
+        object.__setattr__(event, 'order', list(self.order))
+        return event
+
+    def __bytes__(self):
+        schema = self.schema
+        return bytes(schema.format_version + schema.serializer(schema.headers, self.to_dict()))
+
+    def __str__(self):
+        return str(bytes(self), 'utf-8')
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def json(self, indent=None):
+        return json.dumps(self.to_dict(), indent=indent)
+
+
 class Cef(EventFormat):
 
     # REF: About Source/Attacker Destination/Target
@@ -1062,6 +1493,88 @@ class Cef(EventFormat):
     def default_aliases(cls):
         return dict(cls.__default_aliases)
 
+    __headers = (
+        'deviceVendor',
+        'deviceProduct',
+        'deviceVersion',
+        'deviceEventClassId',
+        'name',
+        'deviceSeverity'
+    )
+
+    @classmethod
+    def default_data(cls):
+        return {
+            'deviceVendor': 'CyberSIEM(R) Community',
+            'deviceProduct': 'SIEM Kit',
+            'deviceVersion': '0',
+            'deviceEventClassId': 100,
+            # 'name': 'https://github.com/DK26/cef-prototype',  # https://github.com/cybersiem/community
+            'name': 'https://github.com/cybersiem/community',
+            'deviceSeverity': CefSeverity.UNKNOWN
+        }
+
+    __schemas = {}
+
+    @classmethod
+    def schema(cls, version=0) -> EventSchema:
+        """
+        A shared `EventSchema` of the CEF default aliases & values, for `CompactEvent` objects.
+        :param version: CEF version
+        :return:
+        """
+        schema = cls.__schemas.get(version)
+
+        if schema is None:
+
+            aliases = cls.default_aliases()
+            for k, v in aliases.items():
+                if v in aliases.keys():
+                    aliases[k] = aliases[v]
+
+            schema = EventSchema(
+                format_='CEF',
+                version=version,
+                headers=cls.__headers,
+                aliases=aliases,
+                defaults=cls.default_data()
+            )
+            cls.__schemas[version] = schema
+
+        return schema
+
+    __prototype = None
+
+    @classmethod
+    def prototype(cls):
+        """
+        The resolved default aliases & the key declaration of a `Cef` constructed without custom aliases.
+            Computed by the first construction, then shared (frozen) by later ones.
+             Events copy it only when they change it (see `update_aliases()` & `available_keys()`).
+        :return: Aliases mapping & key declaration frozenset
+        """
+        if Cef.__prototype is None:
+
+            aliases = cls.default_aliases()
+            for k, v in aliases.items():
+                if v in aliases.keys():
+                    aliases[k] = aliases[v]
+
+            key_declaration = siemkit_data.words_set(aliases)
+            key_declaration.update(cls.default_data().keys())
+
+            Cef.__prototype = MappingProxyType(aliases), frozenset(key_declaration)
+
+        return Cef.__prototype
+
+    def compact(self) -> CompactEvent:
+        """
+        A compact copy of the current event state, for buffering.
+        :return:
+        """
+        _, version = self.format_version()
+        return CompactEvent(Cef.schema(version), self)
+
     def __init__(
             self,
             version=0,
@@ -1088,65 +1601,58 @@ class Cef(EventFormat):
         if data is None:
             data = {}
 
-        if aliases is None:
-            aliases = {}
-
         if timestamp_fields is None:
             timestamp_fields = set()
 
-        cef_key_declaration = set()
-
-        cef_json = {
-            'deviceVendor': 'CyberSIEM(R) Community',
-            'deviceProduct': 'SIEM Kit',
-            'deviceVersion': '0',
-            'deviceEventClassId': 100,
-            # 'name': 'https://github.com/DK26/cef-prototype',  # https://github.com/cybersiem/community
-            'name': 'https://github.com/cybersiem/community',
-            'deviceSeverity': CefSeverity.UNKNOWN
-        }
+        cef_json = Cef.default_data()
 
         cef_json.update(data)
 
-        default_aliases = Cef.default_aliases()
-        cef_key_declaration.update(siemkit_data.words_set(aliases))
+        if aliases is None:
 
-        aliases.update(default_aliases)
+            # Share the frozen prototype, instead of resolving the default aliases again
+            aliases, cef_key_declaration = Cef.prototype()
 
+            if data or fields:
+                cef_key_declaration = cef_key_declaration.union(data.keys(), fields)
 
-        #for k, v in cef_aliases.items():
-        #    cef_key_declaration.add(k)
-        #    cef_key_declaration.add(v)
+        else:
 
-        # Done: Enable self (double) aliases
-        for k, v in aliases.items():
-            if v in aliases.keys():
-                aliases[k] = aliases[v]
-            else:
-                aliases[k] = v
-        # cef_aliases.update(aliases)
+            cef_key_declaration = set()
+
+            default_aliases = Cef.default_aliases()
+            cef_key_declaration.update(siemkit_data.words_set(aliases))
+
+            aliases.update(default_aliases)
+
+            #for k, v in cef_aliases.items():
+            #    cef_key_declaration.add(k)
+            #    cef_key_declaration.add(v)
+
+            # Done: Enable self (double) aliases
+            for k, v in aliases.items():
+                if v in aliases.keys():
+                    aliases[k] = aliases[v]
+                else:
+                    aliases[k] = v
+            # cef_aliases.update(aliases)
+
+            cef_key_declaration.update(siemkit_data.words_set(aliases))
 
-        # Other Key Declaration
-        # cef_key_declaration.update()
+            # Other Key Declaration
+            # cef_key_declaration.update()
 
-        # if default_aliases is None:
-        #    default_aliases = set(cef_key_declaration)
+            # if default_aliases is None:
+            #    default_aliases = set(cef_key_declaration)
 
-        # Update potential custom key declarations
-        cef_key_declaration.update(cef_json.keys())
-        cef_key_declaration.update(fields)
+            # Update potential custom key declarations
+            cef_key_declaration.update(cef_json.keys())
+            cef_key_declaration.update(fields)
 
         super().__init__(
             format_='CEF',
             version=version,
-            headers=(
-                'deviceVendor',
-                'deviceProduct',
-                'deviceVersion',
-                'deviceEventClassId',
-                'name',
-                'deviceSeverity'
-            ),
+            headers=Cef.__headers,
             data=cef_json,
             raw=raw,
             aliases=aliases,
@@ -1161,7 +1667,8 @@ class Cef(EventFormat):
             outputs=outputs,  # DIY
             tcp=tcp,  # Batteries included
             udp=udp,  # Batteries included
-            file=file  # Batteries included
+            file=file,  # Batteries included
+            aliases_declared=True
         )
 
 
@@ -16,12 +16,21 @@
 
 from enum import IntFlag
 from enum import Enum
+from typing import Callable
 from typing import Generator
+from typing import Tuple
+from typing import Union
+from datetime import datetime
+from datetime import timezone
 
 import json
+import queue
 import re
+import threading
 
 from siemkit.logging import dump_debug
+from siemkit.time import LdapTimestamp
+from siemkit.data import HighWaterMarkTracker
 from . import adaptors
 
 
@@ -131,6 +140,12 @@ class Attributes(str, Enum):
         return self.value
 
 
+USN_CHANGED = 'uSNChanged'
+WHEN_CHANGED = 'whenChanged'
+HIGHEST_COMMITTED_USN = 'highestCommittedUSN'
+CURRENT_TIME = 'currentTime'
+
+
 class SearchScope(str, Enum):
 
     SUBTREE = 'SUBTREE'
@@ -149,6 +164,21 @@ def query_since(query: str, time_field: str, time: str) -> str:
         return f'(&({time_field}>={time}){query})'
 
 
+def query_until(query: str, field: str, value) -> str:
+
+    if query.startswith('(&'):
+        return query.replace('(&', f'(&({field}<={value})', 1)
+    else:
+        return f'(&({field}<={value}){query})'
+
+
+def query_usn_since(query: str, usn: int) -> str:
+    """
+    Objects changed after an update sequence number (`uSNChanged` - local to the domain controller).
+    """
+    return query_since(query, USN_CHANGED, usn + 1)
+
+
 def query_sam_account_type(sam_account_type: int) -> str:
     return f'(sAMAccountType={sam_account_type})'
 
@@ -208,3 +238,303 @@ def forest_domains(ldap_adaptor: adaptors.Ldap, forest_name: str, debug_mode=Fal
         yield entry['attributes']['nCName'][0]
 
 
+class LdapConnectionPool:
+    """
+    Connected LDAP adaptors by domain, created on first use & reused across searches (Thread-safe).
+        e.g.
+            def connect(domain):
+                ldap_adaptor = adaptors.Ldap3Module(ldap3)
+                ldap_adaptor.connect(from_dc(domain), 'NTLM', True, None, None, user, password, 'ALL', True)
+                return ldap_adaptor
+
+            with LdapConnectionPool(connect) as pool:
+                for domain, entry in search_domains(pool, domains, CommonQueries.ALL_USER_OBJECTS):
+                    ...
+    """
+
+    def __init__(self, connect: Callable[[str], adaptors.Ldap]):
+        """
+        :param connect: Create a connected (bound) adaptor of a domain (e.g. 'DC=example,DC=com')
+        """
+        self.__connect = connect
+        self.__connections = {}
+        self.__domain_locks = {}
+        self.__lock = threading.Lock()
+
+    def connection(self, domain: str) -> adaptors.Ldap:
+        with self.__lock:
+            ldap_adaptor = self.__connections.get(domain)
+            if ldap_adaptor is not None:
+                return ldap_adaptor
+            domain_lock = self.__domain_locks.setdefault(domain, threading.Lock())
+
+        # Connect under the domain's lock, a slow domain doesn't block connecting to the others.
+        with domain_lock:
+            with self.__lock:
+                ldap_adaptor = self.__connections.get(domain)
+            if ldap_adaptor is None:
+                ldap_adaptor = self.__connect(domain)
+                with self.__lock:
+                    self.__connections[domain] = ldap_adaptor
+            return ldap_adaptor
+
+    def close(self):
+        with self.__lock:
+            connections = list(self.__connections.values())
+            self.__connections.clear()
+
+        for ldap_adaptor in connections:
+            ldap_adaptor.unbind()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def search_domains(
+        pool: LdapConnectionPool,
+        domains,
+        search_filter: Union[str, Callable[[str], str]],
+        search_scope: str = 'SUBTREE',
+        attributes='*',
+        page_size=1_000,
+        max_workers=4,
+        buffer_size=10_000
+) -> Generator[Tuple[str, dict], None, None]:
+    """
+    Search several domains concurrently (One connection per domain), in pages.
+        Entries are yielded as their pages arrive, up to `buffer_size` entries wait for the consumer.
+    :param pool:
+    :param domains: Search bases, e.g. of `forest_domains()`
+    :param search_filter: A filter, or a function of a domain to its filter
+    :param search_scope:
+    :param attributes:
+    :param page_size: Entries per page
+    :param max_workers: Domains searched concurrently
+    :param buffer_size: Maximum entries waiting to be yielded
+    :return: Generator of (domain, entry)
+    """
+    from concurrent.futures import ThreadPoolExecutor  # Imported on use (`concurrent.futures` imports `logging`)
+
+    domains = list(dict.fromkeys(domains))
+    entries = queue.Queue(maxsize=buffer_size)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                entries.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def search(domain):
+        try:
+            ldap_adaptor = pool.connection(domain)
+            for entry in ldap_adaptor.paged_search(
+                    search_base=domain,
+                    search_filter=search_filter(domain) if callable(search_filter) else search_filter,
+                    search_scope=search_scope,
+                    attributes=attributes,
+                    page_size=page_size
+            ):
+                if not put((domain, entry)):
+                    return
+        except Exception as e:
+            put((done, e))
+        else:
+            put((done, None))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = []
+    try:
+        for domain in domains:
+            futures.append(executor.submit(search, domain))
+
+        remaining = len(domains)
+        while remaining:
+            domain, entry = entries.get()
+
+            if domain is done:
+                remaining -= 1
+                if entry is not None:
+                    raise entry
+                continue
+
+            yield domain, entry
+    finally:
+        stopped.set()
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def forest_search(
+        ldap_adaptor: adaptors.Ldap,
+        pool: LdapConnectionPool,
+        forest_name: str,
+        search_filter: str,
+        search_scope: str = 'SUBTREE',
+        attributes='*',
+        page_size=1_000,
+        max_workers=4
+) -> Generator[Tuple[str, dict], None, None]:
+    """
+    Search all the domains of a forest concurrently, in pages (See `search_domains()`).
+    :param ldap_adaptor: A connected adaptor, for listing the forest's domains
+    :param pool: Connections of the domains
+    :param forest_name: e.g. example.com
+    :param search_filter:
+    :param search_scope:
+    :param attributes:
+    :param page_size:
+    :param max_workers:
+    :return: Generator of (domain, entry)
+    """
+    yield from search_domains(
+        pool,
+        forest_domains(ldap_adaptor, forest_name),
+        search_filter,
+        search_scope=search_scope,
+        attributes=attributes,
+        page_size=page_size,
+        max_workers=max_workers
+    )
+
+
+def entry_attribute(entry: dict, attribute: str):
+    """
+    An attribute's (first) value of an entry, the attribute's name is case insensitive.
+    """
+    attribute = attribute.lower()
+    for name, value in entry.get('attributes', {}).items():
+        if name.lower() == attribute:
+            if isinstance(value, (list, tuple)):
+                return value[0] if value else None
+            return value
+    return None
+
+
+def ldap_time(value) -> Union[str, None]:
+    """
+    Normalize a generalized time (e.g. `whenChanged`) to a `LdapTimestamp`.
+        Active Directory times are in UTC, so are times without a time zone.
+    :param value: A datetime, '20201019120000.0Z' or '2020-10-19 12:00:00+00:00'
+    """
+    if value is None:
+        return None
+
+    if not isinstance(value, datetime):
+        value = str(value)
+        if value[:14].isdigit():
+            return f'{value[:14]}.0Z'
+        value = datetime.fromisoformat(value)
+
+    return LdapTimestamp.from_datetime(value, tz=value.tzinfo or timezone.utc)
+
+
+def root_dse(ldap_adaptor: adaptors.Ldap, attributes='*') -> dict:
+    """
+    The rootDSE entry of the connected domain controller, e.g. `highestCommittedUSN` & `currentTime`.
+    """
+    ldap_adaptor.search(
+        search_base='',
+        search_filter='(objectClass=*)',
+        search_scope='BASE',
+        attributes=attributes
+    )
+
+    for entry in ldap_adaptor.entries():
+        return entry
+
+    raise Exception("Could not read the rootDSE entry.")
+
+
+def poll_changes(
+        pool: LdapConnectionPool,
+        tracker: HighWaterMarkTracker,
+        domains,
+        search_filter: str,
+        search_scope: str = 'SUBTREE',
+        attributes='*',
+        page_size=1_000,
+        max_workers=4,
+        buffer_size=10_000,
+        use_usn=True
+) -> Generator[Tuple[str, dict], None, None]:
+    """
+    Search the objects changed since the last poll, by the high-water marks of each domain (All objects on the first poll).
+        e.g. Every minute:
+            with HighWaterMarkTracker('ad-users.json') as tracker:
+                for domain, entry in poll_changes(pool, tracker, domains, CommonQueries.ALL_USER_OBJECTS):
+                    ...
+
+        Before searching a domain, its domain controller's `highestCommittedUSN` & `currentTime` (rootDSE) bound the
+         search & become the next marks - objects changed during the poll are left to the next poll.
+        The marks advance (& the tracker is saved) once all the changes were consumed, an interrupted poll is repeated.
+        `uSNChanged` is local to the domain controller - connect each domain to the same one, or set `use_usn=False`.
+        By `whenChanged` (Replicated, in seconds), the objects changed at the mark's second are yielded again,
+         & objects replicated to the domain controller after the poll with an earlier `whenChanged` are missed.
+    :param pool:
+    :param tracker: Marks ({'usn': ..., 'time': ...}) by domain
+    :param domains: Search bases, e.g. of `forest_domains()`
+    :param search_filter:
+    :param search_scope:
+    :param attributes:
+    :param page_size:
+    :param max_workers:
+    :param buffer_size:
+    :param use_usn: Search by `uSNChanged` (False - by `whenChanged`)
+    :return: Generator of (domain, entry)
+    """
+    domains = list(dict.fromkeys(domains))
+    search_filter = str(search_filter)
+
+    bounds = {}  # Domain -> The marks of the poll start
+
+    def changes_filter(domain):
+        # Called by `search_domains()` before searching, on the domain's connection.
+        entry = root_dse(pool.connection(domain), [HIGHEST_COMMITTED_USN, CURRENT_TIME])
+
+        time = ldap_time(entry_attribute(entry, CURRENT_TIME))
+        if time is None:
+            time = LdapTimestamp.from_datetime(datetime.now(timezone.utc), tz=timezone.utc)
+
+        usn = entry_attribute(entry, HIGHEST_COMMITTED_USN)
+        mark = tracker.mark(domain)
+
+        if use_usn:
+            if usn is None:
+                raise Exception(f"Could not read the {HIGHEST_COMMITTED_USN} of {domain}, poll with use_usn=False.")
+            usn = int(usn)
+            query = query_until(search_filter, USN_CHANGED, usn)
+        else:
+            usn = None  # A mark of one domain controller only, unused.
+            query = query_until(search_filter, WHEN_CHANGED, time)
+
+        if use_usn and 'usn' in mark:
+            query = query_usn_since(query, mark['usn'])
+        elif 'time' in mark:
+            query = query_since(query, WHEN_CHANGED, mark['time'])
+
+        bounds[domain] = {'usn': usn, 'time': time}
+        return query
+
+    yield from search_domains(
+        pool,
+        domains,
+        changes_filter,
+        search_scope=search_scope,
+        attributes=attributes,
+        page_size=page_size,
+        max_workers=max_workers,
+        buffer_size=buffer_size
+    )
+
+    for domain, marks in bounds.items():
+        tracker.advance(domain, **marks)
+    tracker.save()
@@ -13,10 +13,15 @@
 #   limitations under the License.
 
 from typing import Any
+from typing import Generator
+from typing import Union
 from telnetlib import Telnet
 from time import sleep
+from time import monotonic
 from abc import ABC
 from abc import abstractmethod
+import struct
+import sys
 
 from . import send
 
@@ -98,6 +103,221 @@ class TcpConnection(WriteableConnection):
         self.__session.close()
 
 
+class SharedMemoryRing(WriteableConnection):
+    """
+    A single-producer / single-consumer ring buffer of length-prefixed records in shared memory.
+        Hands serialized events between processes without pickling them.
+
+        Producer process (e.g. as an `EventFormat` output):
+
+            ring = net.SharedMemoryRing(capacity=16 * 1024 * 1024)
+            event = Cef(outputs=ring)  # Pass `ring.name()` to the consumer process
+
+        Consumer process (e.g. feeding a `net` sender):
+
+            ring = net.SharedMemoryRing(name)
+            net.forward(ring, net.udp('127.0.0.1'))
+
+        The producer's `close()` marks the ring as closed, the consumer stops once it is drained.
+        The creating process is responsible for calling `unlink()` once both sides are done.
+    """
+
+    # Header: read position, write position, data capacity & closed flag. Positions only grow.
+    HEADER = struct.Struct('<QQQQ')
+    HEADER_SIZE = 64
+
+    LENGTH = struct.Struct('<I')
+    WRAP = 0xFFFFFFFF  # Length marker: the rest of the data region is unused, continue from its start.
+
+    def __init__(
+            self,
+            name: str = None,
+            capacity: int = 1024 * 1024,
+            timeout: float = None,
+            poll_interval: float = 0.0005
+    ):
+        """
+        :param name: A shared memory block name to attach to. If None, a new ring is created.
+        :param capacity: Data capacity in bytes of a new ring.
+        :param timeout: Seconds to wait for free space (write) or a record (read). None waits forever.
+        :param poll_interval: Seconds to sleep between checks while waiting.
+        """
+
+        from multiprocessing.shared_memory import SharedMemory  # Imported on use, `net` is imported by short lived jobs.
+
+        self.__timeout = timeout
+        self.__poll_interval = poll_interval
+
+        if name is None:
+            self.__shared_memory = SharedMemory(create=True, size=SharedMemoryRing.HEADER_SIZE + capacity)
+            SharedMemoryRing.HEADER.pack_into(self.__shared_memory.buf, 0, 0, 0, capacity, 0)
+        elif sys.version_info >= (3, 13):
+            self.__shared_memory = SharedMemory(name=name, track=False)
+        else:
+            self.__shared_memory = SharedMemory(name=name)
+
+        self.__buffer = self.__shared_memory.buf
+        self.__data = self.__buffer[SharedMemoryRing.HEADER_SIZE:]
+        self.__capacity = SharedMemoryRing.HEADER.unpack_from(self.__buffer, 0)[2]
+
+        # Read position to publish on the next read, releasing a record returned without copying.
+        self.__pending_head = None
+
+    def name(self) -> str:
+        return self.__shared_memory.name
+
+    def __position(self, index: int) -> int:
+        return struct.unpack_from('<Q', self.__buffer, index * 8)[0]
+
+    def __publish(self, index: int, value: int):
+        struct.pack_into('<Q', self.__buffer, index * 8, value)
+
+    def __wait(self, deadline):
+        if deadline is not None and monotonic() > deadline:
+            raise TimeoutError("Shared memory ring buffer timed out.")
+        sleep(self.__poll_interval)
+
+    def __deadline(self):
+        return None if self.__timeout is None else monotonic() + self.__timeout
+
+    def closed(self) -> bool:
+        return self.__position(3) != 0
+
+    def write(self, payload: Any) -> int:
+
+        if not isinstance(payload, (bytes, bytearray, memoryview)):
+            payload = send.to_bytes(payload)
+
+        capacity = self.__capacity
+        length_size = SharedMemoryRing.LENGTH.size
+        size = length_size + len(payload)
+
+        if size > capacity:
+            raise ValueError(f"Record of {len(payload)} bytes exceeds the ring capacity of {capacity} bytes.")
+
+        tail = self.__position(1)
+        position = tail % capacity
+        contiguous = capacity - position
+
+        # A record is never split: if it doesn't fit until the end of the data region, it starts over.
+        needed = size if contiguous >= size else contiguous + size
+
+        deadline = self.__deadline()
+        while capacity - (tail - self.__position(0)) < needed:
+            self.__wait(deadline)
+
+        data = self.__data
+
+        if contiguous < size:
+            if contiguous >= length_size:
+                SharedMemoryRing.LENGTH.pack_into(data, position, SharedMemoryRing.WRAP)
+            tail += contiguous
+            position = 0
+
+        SharedMemoryRing.LENGTH.pack_into(data, position, len(payload))
+        data[position + length_size:position + size] = payload
+
+        # Publish only after the record is in place.
+        self.__publish(1, tail + size)
+
+        return len(payload)
+
+    def read(self, copy: bool = True) -> Union[bytes, memoryview, None]:
+        """
+        Read the next record.
+        :param copy: If False, returns a memoryview of the record inside the ring, without copying it.
+                      The view is valid until the next `read()` call.
+        :return: The record, or None if the ring is closed & drained.
+        """
+
+        if self.__pending_head is not None:
+            self.__publish(0, self.__pending_head)
+            self.__pending_head = None
+
+        capacity = self.__capacity
+        length_size = SharedMemoryRing.LENGTH.size
+        data = self.__data
+        head = self.__position(0)
+
+        deadline = self.__deadline()
+
+        while True:
+
+            if head == self.__position(1):
+                if self.closed() and head == self.__position(1):
+                    return None
+                self.__wait(deadline)
+                continue
+
+            position = head % capacity
+            contiguous = capacity - position
+
+            if contiguous < length_size:
+                head += contiguous
+                continue
+
+            length = SharedMemoryRing.LENGTH.unpack_from(data, position)[0]
+
+            if length == SharedMemoryRing.WRAP:
+                head += contiguous
+                continue
+
+            start = position + length_size
+            head += length_size + length
+
+            if copy:
+                record = bytes(data[start:start + length])
+                self.__publish(0, head)
+                return record
+
+            self.__pending_head = head
+            return data[start:start + length]
+
+    def records(self, copy: bool = True) -> Generator[Union[bytes, memoryview], None, None]:
+        """
+        Generates records until the ring is closed & drained.
+        """
+        while True:
+            record = self.read(copy=copy)
+            if record is None:
+                return
+            yield record
+
+    def close(self):
+        """
+        Mark the ring as closed. Called by the producer when it is done writing.
+        """
+        self.__publish(3, 1)
+
+    def release(self):
+        """
+        Release this process's mapping of the ring.
+        """
+        if self.__pending_head is not None:
+            self.__publish(0, self.__pending_head)
+            self.__pending_head = None
+
+        self.__data.release()
+        self.__buffer.release()
+        self.__shared_memory.close()
+
+    def unlink(self):
+        self.__shared_memory.unlink()
+
+
+def forward(ring: SharedMemoryRing, connection: WriteableConnection) -> int:
+    """
+    Write the records of a shared memory ring to a connection, until the ring is closed & drained.
+    :return: Total bytes written
+    """
+    size = 0
+
+    for record in ring.records():
+        size += connection.write(record)
+
+    return size
+
+
 def tcp(host: str, port: int = 514, timeout: int = 3, retries: int = 2, retry_suspense: int = 3) -> TcpConnection:
     return TcpConnection(
         host=host,
@@ -16,27 +16,34 @@ from typing import Any
 from typing import Tuple
 from typing import Union
 from collections import deque
+from functools import lru_cache
 import datetime
 import re
 
 from siemkit import random
+from siemkit.time import FiletimeTimestamp
+from siemkit.time import LdapTimestamp
 
-import pytimeparse
+# The following modules are imported on first use, `dateparser` alone takes hundreds of milliseconds to import.
+
+# import pytimeparse
 # * pytimeparse - MIT License
 #     by: wroberts
 #     source: https://github.com/wroberts/pytimeparse
 
-import hfilesize
+# import hfilesize
 #  * hfilesize - MIT License
 #     by: simonzack
 #     source: https://github.com/simonzack/hfilesize
 
-import dateparser
+# import dateparser
 # * dateparser - BSD 3-Clause License
 #     source: https://github.com/scrapinghub/dateparser
 #     license: https://github.com/scrapinghub/dateparser/blob/master/LICENSE
 
 
+SPEC_CACHE_SIZE = 1_024  # Parsed specs (`timedelta()`, `size()` & `time_range()` strings) kept per cache.
+
 default = {
     'parse_true': {
         't', 'true', 'yes', 'y', 'ok', 'on', '1', '+', 'v', 'x', 'k', 'some', 'active', 'activated', 'include',
@@ -51,14 +58,208 @@ default = {
 }
 
 
-def time_range(time_string: str) -> Tuple[datetime.datetime, datetime.datetime]:
+def epoch_seconds(time_string: str) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(int(time_string))
+
+
+def epoch_millis(time_string: str) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(int(time_string) / 1_000)
+
+
+def filetime(time_string: str) -> datetime.datetime:
+    return FiletimeTimestamp.to_datetime(int(time_string))
+
+
+def ldap(time_string: str) -> datetime.datetime:
+    return LdapTimestamp.to_datetime(time_string)
+
+
+def iso8601(time_string: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(time_string)
+
+
+def syslog(time_string: str) -> datetime.datetime:
+    # No year in the format, the current year is assumed (Also keeps February 29th valid).
+    return datetime.datetime.strptime(f"{datetime.date.today().year} {time_string}", "%Y %b %d %H:%M:%S")
+
+
+def arcsight(time_string: str) -> datetime.datetime:
+    return datetime.datetime.strptime(time_string, "%b %d %Y %H:%M:%S")
+
+
+time_formats = {
+    'epoch_millis': (re.compile(r'\d{13}'), epoch_millis),
+    'epoch': (re.compile(r'\d{9,10}'), epoch_seconds),
+    'filetime': (re.compile(r'\d{17,18}'), filetime),
+    'ldap': (re.compile(r'\d{14}\.0Z'), ldap),
+    'iso8601': (
+        re.compile(r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?(?:Z|[+-]\d{2}:?\d{2})?)?'),
+        iso8601
+    ),
+    'syslog': (re.compile(r'[A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}'), syslog),
+    'arcsight': (re.compile(r'[A-Z][a-z]{2} \d{1,2} \d{4} \d{2}:\d{2}:\d{2}'), arcsight)
+}
+
+
+class TimeParser:
+    """
+    Time string parser with format inference.
+
+        The format of the first value of a stream (e.g. an event field) is detected & its dedicated parser is used
+         for the following values. A value which doesn't match the stream's format is detected again.
+         Values of no known format (e.g. "1 day ago") are parsed by the fallback (`dateparser.parse`).
+
+        Known formats (`siemkit.parse.time_formats`):
+            epoch_millis    - 1603108800000
+            epoch           - 1603108800
+            filetime        - 132475824000000000
+            ldap            - 20201019120000.0Z
+            iso8601         - 2020-10-19T12:00:00.123+02:00
+            syslog          - Oct 19 12:00:00
+            arcsight        - Oct 19 2020 12:00:00
+    """
+
+    def __init__(self, formats=None, fallback=None):
+        """
+        :param formats: Known formats - {name: (compiled fullmatch pattern, parser function)}
+        :param fallback: Parser of unknown formats (Default - `dateparser.parse`)
+        """
+        if formats is None:
+            formats = time_formats
+
+        self.__formats = dict(formats)
+        self.__fallback = fallback
+        self.__streams = {}
+
+    def detect(self, time_string: str):
+        """
+        :param time_string:
+        :return: The name of the detected format, or None for an unknown format.
+        """
+        for name, (pattern, _) in self.__formats.items():
+            if pattern.fullmatch(time_string):
+                return name
+
+    def formats(self) -> dict:
+        """
+        :return: The detected format of each stream - {stream: format name}
+        """
+        return {stream: name for stream, (name, _, _) in self.__streams.items()}
+
+    def known(self, time_string: str, stream=None) -> Union[datetime.datetime, None]:
+        """
+        Parse a time string of a known format.
+        :param time_string:
+        :param stream: Values of the same stream share a detected format
+        :return: datetime object, or None for an unknown format.
+        """
+        detected = self.__streams.get(stream)
+        if detected is not None:
+            _, pattern, parser = detected
+            if pattern.fullmatch(time_string):
+                try:
+                    return parser(time_string)
+                except ValueError:
+                    pass
+
+        name = self.detect(time_string)
+        if name is None:
+            return None
+
+        pattern, parser = self.__formats[name]
+        try:
+            result = parser(time_string)
+        except ValueError:
+            return None
+
+        self.__streams[stream] = (name, pattern, parser)
+        return result
+
+    def __call__(self, time_string: str, stream=None) -> datetime.datetime:
+        """
+        Parse a time string of a known format, or with the fallback parser.
+        :param time_string:
+        :param stream: Values of the same stream share a detected format
+        :return: datetime object
+        """
+        result = self.known(time_string, stream)
+        if result is None:
+            fallback = self.__fallback
+            if fallback is None:
+                import dateparser
+                fallback = dateparser.parse
+            result = fallback(time_string)
+
+        return result
+
+    def reset(self):
+        """
+        Forget the detected formats.
+        """
+        self.__streams.clear()
+
+
+time_parser = TimeParser()
+
+
+def time_bound(time_string: str) -> Union[datetime.datetime, datetime.timedelta, str]:
+    """
+    Analyze a time string into a reusable bound, by parsing it relative to 2 different times:
+        Absolute time (e.g. "1/1/2020") - The datetime.
+        Relative time (e.g. "3 days ago", "now") - The timedelta from the current time.
+        Other (e.g. "midnight") - The time string itself, to be parsed again on each use.
+    :param time_string:
+    :return:
+    """
+    import dateparser
+
+    relative_base = datetime.datetime.now()
+    other_relative_base = relative_base - datetime.timedelta(days=1, hours=1, minutes=1, seconds=1, microseconds=1)
+
+    result = dateparser.parse(time_string, settings={'RELATIVE_BASE': relative_base})
+    other_result = dateparser.parse(time_string, settings={'RELATIVE_BASE': other_relative_base})
+
+    if result is None or other_result is None:
+        return time_string
+
+    if result == other_result:
+        return result
+
+    if result - relative_base == other_result - other_relative_base:
+        return result - relative_base
+
+    return time_string
+
+
+def resolve_time_bound(bound: Union[datetime.datetime, datetime.timedelta, str]) -> datetime.datetime:
+    if isinstance(bound, datetime.datetime):
+        return bound
+    if isinstance(bound, datetime.timedelta):
+        return datetime.datetime.now() + bound
+
+    import dateparser
+    return dateparser.parse(bound)
+
+
+@lru_cache(maxsize=SPEC_CACHE_SIZE)
+def time_range_spec(time_string: str) -> Union[Tuple[Any, Any], None]:
+    """
+    The deterministic part of `time_range()` - The range bounds (see `time_bound()`), or None.
+    """
     assigned_range = re.match(r'^.*?between\s(.*?)\sand\s(.*?$)', time_string, flags=re.IGNORECASE)
     if assigned_range:
         from_time_string, to_time_string = assigned_range.groups()
-        return dateparser.parse(from_time_string), dateparser.parse(to_time_string)
+        return time_bound(from_time_string), time_bound(to_time_string)
+
+
+def time_range(time_string: str) -> Tuple[datetime.datetime, datetime.datetime]:
+    spec = time_range_spec(time_string)
+    if spec:
+        from_bound, to_bound = spec
+        return resolve_time_bound(from_bound), resolve_time_bound(to_bound)
 
 
-def time(time_string: str) -> datetime.datetime:
+def time(time_string: str, stream=None) -> datetime.datetime:
     """
     Parse a time string into a datetime object.
 
@@ -70,6 +271,9 @@ def time(time_string: str) -> datetime.datetime:
         Results in:
          datetime.datetime(1988, 11, 21, 0, 0)
 
+    Common machine formats (epoch, ISO 8601, syslog, etc.) are parsed by format specific parsers,
+     see `TimeParser`. Other strings are parsed by `dateparser`.
+
     Relative time ("ago") is also supported:
 
         A string of:
@@ -86,8 +290,13 @@ def time(time_string: str) -> datetime.datetime:
 
 
     :param time_string:
+    :param stream: Values of the same stream (e.g. an event field name) share a detected format
     :return: datetime object
     """
+    result = time_parser.known(time_string, stream)
+    if result is not None:
+        return result
+
     datetime_range = time_range(time_string)
     if datetime_range:
         from_time_string, to_time_string = datetime_range
@@ -96,6 +305,7 @@ def time(time_string: str) -> datetime.datetime:
             to_time_string
         )
     else:
+        import dateparser
         result = dateparser.parse(time_string)
 
     return result
@@ -124,20 +334,33 @@ def timedelta(time_delta_string: str) -> datetime.timedelta:
     :param time_delta_string:
     :return: timedelta object
     """
+    from_timedelta, to_timedelta = timedelta_spec(time_delta_string)
+
+    if to_timedelta is None:
+        return from_timedelta
+
+    return random.timedelta(from_timedelta, to_timedelta)
+
+
+@lru_cache(maxsize=SPEC_CACHE_SIZE)
+def timedelta_spec(time_delta_string: str) -> Tuple[datetime.timedelta, Union[datetime.timedelta, None]]:
+    """
+    The deterministic part of `timedelta()` - The range bounds, or the timedelta & None.
+    """
+    import pytimeparse
+
     time_delta_string = time_delta_string.lower().replace("and", '').replace('every', '')
 
     assigned_range = re.match(r'^.*?from\s(.*?)\sto\s(.*?$)', time_delta_string)
 
     if assigned_range:
         from_time_string, to_time_string = assigned_range.groups()
-        result = random.timedelta(
+        return (
             datetime.timedelta(seconds=pytimeparse.parse(from_time_string)),
             datetime.timedelta(seconds=pytimeparse.parse(to_time_string))
         )
-    else:
-        result = datetime.timedelta(seconds=pytimeparse.parse(time_delta_string))
 
-    return result
+    return datetime.timedelta(seconds=pytimeparse.parse(time_delta_string)), None
 
 
 def size(size_string: str) -> int:
@@ -155,9 +378,28 @@ def size(size_string: str) -> int:
     :param size_string:
     :return:
     """
+    if isinstance(size_string, str):
+        return size_spec(size_string)
+
+    import hfilesize
     return hfilesize.FileSize(size_string)
 
 
+@lru_cache(maxsize=SPEC_CACHE_SIZE)
+def size_spec(size_string: str) -> int:
+    import hfilesize
+    return hfilesize.FileSize(size_string)
+
+
+def clear_spec_caches():
+    """
+    Clear the parsed specs of `timedelta()`, `size()` & `time_range()`.
+    """
+    timedelta_spec.cache_clear()
+    size_spec.cache_clear()
+    time_range_spec.cache_clear()
+
+
 def boolean(bool_string: Union[str, bool]) -> bool:
 
     if isinstance(bool_string, bool):
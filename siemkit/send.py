@@ -20,9 +20,7 @@ from telnetlib import Telnet
 from typing import Any
 from ipaddress import ip_address
 
-from siemkit.smtp import AUTH_MODULE_FACTORY as SMTP_AUTH_MODULE_FACTORY
-from siemkit.smtp import Connection as SmtpConnection
-from siemkit.smtp import MultipartMimeMessage
+# `siemkit.smtp` (smtplib & email) is imported by `smtp()`, on use.
 
 default = {
     'unicode': 'utf-8',
@@ -155,6 +153,10 @@ def smtp(
         port=None,
         encoding='utf-8'
 ):
+    from siemkit.smtp import AUTH_MODULE_FACTORY as SMTP_AUTH_MODULE_FACTORY
+    from siemkit.smtp import Connection as SmtpConnection
+    from siemkit.smtp import MultipartMimeMessage
+
     if not isinstance(port, int):
 
         if ':' in server:
@@ -0,0 +1,381 @@
+#   Copyright (C) 2020 CyberSIEM(R)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+A local mock of the ArcSight ESM v72 REST API (`siemkit.api.arcsight.esm.v72`), for testing & benchmarking
+ `siemkit.arcsight.Esm` without a manager.
+
+    with MockEsm(latency=0.005) as mock:
+        mock.add_activelist('list-id', ['user', 'group'], key_fields=['user'])
+
+        esm = Esm(mock.host, mock.port, mock.username, mock.password, scheme='http')
+        esm.add_activelist_entries('list-id', [{'user': 'admin', 'group': 'admins'}])
+
+        mock.requests['addEntries']  # Requests count by endpoint
+"""
+
+import json
+import socket
+import threading
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from time import sleep
+from typing import Generator
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+
+SECURITY_EXCEPTION = {
+    'errorCode': 'SecurityException',
+    'errorMessage': 'com.arcsight.xws.SecurityException: Invalid authentication token'
+}
+
+
+def security_event(event_id: int, event_type: str = 'BASE', base_event_ids=None, padding: int = 0) -> dict:
+    """
+    A security event, as returned by `getSecurityEvents` (Before `simplify_cef()`).
+    :param event_id:
+    :param event_type: BASE, CORRELATION, AGGREGATED or ACTION
+    :param base_event_ids: Sub events of a correlation event
+    :param padding: Extra characters of the `message` field, to adjust the payload size
+    :return:
+    """
+    event = {
+        'eventId': event_id,
+        'type': event_type,
+        'name': 'Correlation' if event_type == 'CORRELATION' else 'Login',
+        'startTime': 1603108800000 + event_id,
+        'endTime': 1603108800000 + event_id,
+        'priority': 5,
+        'baseEventCount': len(base_event_ids) if base_event_ids else 1,
+        'source': {
+            'address': f'10.0.{event_id // 256 % 256}.{event_id % 256}',
+            'port': 1024 + event_id % 64_000,
+            'userName': f'user{event_id % 1_000}'
+        },
+        'destination': {
+            'address': '10.1.0.1',
+            'port': 443,
+            'hostName': 'server.example.com'
+        },
+        'device': {
+            'address': '10.2.0.1',
+            'hostName': 'firewall.example.com',
+            'vendor': 'Vendor',
+            'product': 'Product'
+        },
+        'category': {
+            'behavior': '/Authentication/Verify',
+            'outcome': '/Success'
+        },
+        'message': 'x' * padding
+    }
+
+    if base_event_ids:
+        event['baseEventIds'] = list(base_event_ids)
+
+    return event
+
+
+class MockEsmRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    server: 'MockEsmServer'
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # No Nagle delays on keep-alive.
+
+    def log_message(self, format_, *args):
+        pass
+
+    def reply(self, status_code: int, body=None):
+        data = b'' if body is None else json.dumps(body).encode('utf-8')
+
+        self.server.mock.count(self.endpoint, len(data))  # Before replying, the client may count right after.
+
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    @property
+    def endpoint(self) -> str:
+        return urlparse(self.path).path.rsplit('/', 1)[-1]
+
+    def do_GET(self):
+        self.server.mock.delay()
+        self.reply(*self.server.mock.handle(self.endpoint, parse_qs(urlparse(self.path).query)))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+
+        self.server.mock.delay()
+        self.reply(*self.server.mock.handle(self.endpoint, body))
+
+
+class MockEsmServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address, mock: 'MockEsm'):
+        self.mock = mock
+        super().__init__(address, MockEsmRequestHandler)
+
+
+class MockEsm:
+    """
+    A local HTTP server implementing the ESM v72 endpoints wrapped by `siemkit.api.arcsight.esm.v72`:
+        Login: login, logout, getSession
+        Events: getSecurityEvents
+        Active lists: getEntries, addEntries, deleteEntries, clearEntries, findByUUID, findAllIds
+
+    Events are generated on request - `correlation_events` correlation events (IDs 1 to `correlation_events`),
+     each with `base_events` base events (`baseEventIds`, IDs from 1,000,000). Active lists are held in memory.
+    """
+
+    def __init__(
+            self,
+            host='127.0.0.1',
+            port=0,
+            username='admin',
+            password='password',
+            latency: float = 0.0,
+            correlation_events: int = 1_000,
+            base_events: int = 10,
+            event_padding: int = 0
+    ):
+        """
+        :param host:
+        :param port: 0 - Any free port
+        :param username: Accepted credentials
+        :param password: Accepted credentials
+        :param latency: Seconds added to every request
+        :param correlation_events: Amount of correlation events
+        :param base_events: Base events per correlation event
+        :param event_padding: Extra characters per event (Payload size)
+        """
+        self.host = host
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.correlation_events = correlation_events
+        self.base_events = base_events
+        self.event_padding = event_padding
+
+        self.requests = Counter()  # By endpoint
+        self.bytes_sent = 0
+
+        self.__lock = threading.Lock()
+        self.__tokens = set()
+        self.__activelists = {}  # {resource_id: {'fields': [...], 'key_fields': [...], 'entries': {key: entry}}}
+
+        self.__server = MockEsmServer((host, port), self)
+        self.__thread = None
+
+    @property
+    def port(self) -> int:
+        return self.__server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        if self.__thread is None:
+            self.__thread = threading.Thread(
+                target=self.__server.serve_forever,
+                name='siemkit-mock-esm',
+                daemon=True
+            )
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread = None
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def delay(self):
+        if self.latency:
+            sleep(self.latency)
+
+    def count(self, endpoint: str, size: int):
+        with self.__lock:
+            self.requests[endpoint] += 1
+            self.bytes_sent += size
+
+    def reset_counters(self):
+        with self.__lock:
+            self.requests.clear()
+            self.bytes_sent = 0
+
+    def expire_tokens(self):
+        """
+        Invalidate all the issued tokens, like an expired session.
+        """
+        with self.__lock:
+            self.__tokens.clear()
+
+    def add_activelist(self, resource_id: str, fields, key_fields=(), entries=(), field_types=None):
+        """
+        :param resource_id:
+        :param fields: Field names
+        :param key_fields: Key field names. Empty - All fields are the key.
+        :param entries: Initial entries (dict)
+        :param field_types: Field types. Default - STRING.
+        """
+        fields = list(fields)
+        with self.__lock:
+            self.__activelists[resource_id] = {
+                'fields': fields,
+                'key_fields': list(key_fields),
+                'field_types': list(field_types) if field_types is not None else ['STRING'] * len(fields),
+                'entries': {}
+            }
+        self.write_entries(resource_id, fields, ([entry.get(field, '') for field in fields] for entry in entries))
+
+    def activelist_entries(self, resource_id) -> list:
+        """
+        :return: The entries of an active list (dict)
+        """
+        activelist = self.__activelists[resource_id]
+        with self.__lock:
+            return [dict(zip(activelist['fields'], entry)) for entry in activelist['entries'].values()]
+
+    def write_entries(self, resource_id, columns, rows, delete=False):
+        activelist = self.__activelists[resource_id]
+        fields = activelist['fields']
+        key_fields = activelist['key_fields'] or fields
+        indexes = {column: index for index, column in enumerate(columns)}
+
+        with self.__lock:
+            entries = activelist['entries']
+            for row in rows:
+                key = tuple(str(row[indexes[field]]) if field in indexes else '' for field in key_fields)
+                if delete:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = [str(row[indexes[field]]) if field in indexes else '' for field in fields]
+
+    def events(self, event_ids) -> Generator[dict, None, None]:
+        for event_id in event_ids:
+            event_id = int(event_id)
+
+            if 1 <= event_id <= self.correlation_events:
+                first = 1_000_000 + (event_id - 1) * self.base_events
+                yield security_event(
+                    event_id, 'CORRELATION', range(first, first + self.base_events), padding=self.event_padding
+                )
+            elif 1_000_000 <= event_id < 1_000_000 + self.correlation_events * self.base_events:
+                yield security_event(event_id, padding=self.event_padding)
+
+    def __authorized(self, token) -> bool:
+        with self.__lock:
+            return token in self.__tokens
+
+    def handle(self, endpoint: str, body: dict) -> tuple:
+        """
+        :param endpoint: The endpoint's name, e.g. getEntries
+        :param body: The request's JSON (Query parameters of GET requests)
+        :return: (status code, response JSON)
+        """
+        if endpoint == 'login':
+            login = body.get('log.login', {})
+            if login.get('log.login') != self.username or login.get('log.password') != self.password:
+                return 500, {'errorCode': 'LoginException', 'errorMessage': 'Invalid username or password'}
+
+            token = uuid.uuid4().hex
+            with self.__lock:
+                self.__tokens.add(token)
+            return 200, {'log.loginResponse': {'log.return': token}}
+
+        if endpoint == 'logout':
+            with self.__lock:
+                self.__tokens.discard(body.get('log.logout', {}).get('log.authToken'))
+            return 204, None
+
+        if endpoint == 'getSession':
+            token = (body.get('authToken') or [''])[0]
+            if not self.__authorized(token):
+                return 500, SECURITY_EXCEPTION
+            return 200, {'log.getSessionResponse': {'log.return': {'authToken': token}}}
+
+        request = next(iter(body.values()), {})
+        token = request.get('act.authToken', request.get('sev.authToken'))
+        if not self.__authorized(token):
+            return 500, SECURITY_EXCEPTION
+
+        if endpoint == 'getSecurityEvents':
+            events = list(self.events(request.get('sev.ids') or ()))
+            if not events:
+                return 200, {'sev.getSecurityEventsResponse': {}}
+            return 200, {'sev.getSecurityEventsResponse': {'sev.return': events[0] if len(events) == 1 else events}}
+
+        if endpoint == 'findAllIds':
+            return 200, {'act.findAllIdsResponse': {'act.return': list(self.__activelists)}}
+
+        resource_id = request.get('act.resourceId', request.get('act.id'))
+        activelist = self.__activelists.get(resource_id)
+        if activelist is None:
+            return 500, {'errorCode': 'ResourceException', 'errorMessage': f"Resource '{resource_id}' not found"}
+
+        if endpoint == 'findByUUID':
+            return 200, {
+                'act.findByUUIDResponse': {
+                    'act.return': {
+                        'resourceid': resource_id,
+                        'fieldNames': activelist['fields'],
+                        'keyFields': [field in activelist['key_fields'] for field in activelist['fields']],
+                        'fieldTypes': activelist['field_types']
+                    }
+                }
+            }
+
+        if endpoint == 'getEntries':
+            with self.__lock:
+                entry_list = [{'entry': entry} for entry in activelist['entries'].values()]
+            result = {'columns': activelist['fields']}
+            if entry_list:
+                result['entryList'] = entry_list[0] if len(entry_list) == 1 else entry_list
+            return 200, {'act.getEntriesResponse': {'act.return': result}}
+
+        if endpoint in ('addEntries', 'deleteEntries'):
+            entry_list = request.get('act.entryList', {})
+            self.write_entries(
+                resource_id,
+                entry_list.get('columns', []),
+                (entry['entry'] for entry in entry_list.get('entryList', [])),
+                delete=endpoint == 'deleteEntries'
+            )
+            return 204, None
+
+        if endpoint == 'clearEntries':
+            with self.__lock:
+                activelist['entries'].clear()
+            return 204, None
+
+        return 404, {'errorCode': 'NotFound', 'errorMessage': f"Unknown endpoint '{endpoint}'"}
@@ -13,10 +13,25 @@
 #   limitations under the License.
 
 from collections.abc import Sequence
+from typing import Any
+from typing import Callable
 from typing import Generator
+from typing import Tuple
 from types import GeneratorType
 from random import randint
 from random import choice
+from datetime import datetime
+from datetime import timedelta
+from ipaddress import IPv4Address
+from heapq import heappush
+from heapq import heappop
+from heapq import merge
+from itertools import islice
+from string import Formatter
+from time import monotonic
+import os
+import random as builtin_random
+import struct
 
 from siemkit.event import Cef
 from siemkit.time import sleep
@@ -121,17 +136,637 @@ def process_random_value(value_):
         return value_
 
 
-# ToDo: Remember last time of event generation and use as `start_time` where now is `end_time`, for `random.time`
-def random_event(event=None, amount=1,  **fields):
+# Result types that are final values & never need another `process_random_value()` pass.
+PLAIN_VALUE_TYPES = frozenset((str, bytes, int, float, bool, type(None), IPv4Address, datetime, timedelta))
+
+
+def resolve_random_value(value_):
+    """
+    A fast path for values produced by compiled random specs:
+     plain values are returned as is, anything else is passed to `process_random_value()`.
+    """
+    if type(value_) in PLAIN_VALUE_TYPES:
+        return value_
+    return process_random_value(value_)
+
+
+def compile_random_value(value_) -> Callable[[], Any]:
+    """
+    Analyze a random value spec once & return a function that produces a value on every call.
+        Accepts the same forms as `process_random_value()`:
+
+            Generator               - The next generated value
+            Callable                - The value returned by calling it
+            (Callable, dict)        - The value returned by calling it with the dictionary as keyword arguments
+            Sequence (not a str)    - A random choice of its items (items are returned as is)
+            Any other value         - The value itself
+
+    :param value_: A random value spec
+    :return: A function with no parameters
+    """
+
+    if isinstance(value_, GeneratorType):
+        next_value = value_.__next__
+        return lambda: resolve_random_value(next_value())
+
+    elif callable(value_):
+        return lambda: resolve_random_value(value_())
+
+    elif not isinstance(value_, str) and isinstance(value_, Sequence):
+
+        if len(value_) == 2 and callable(value_[0]) and isinstance(value_[1], dict):
+            function, kwargs = value_
+            return lambda: resolve_random_value(function(**kwargs))
+
+        items = tuple(value_)
+        return lambda: choice(items)
+
+    else:
+        return lambda: value_
+
+
+def compile_iterable(value_) -> Callable[[], Any]:
+    """
+    Analyze an iterable spec once & return a function that produces an iterable on every call.
+        `(Callable, dict)` & callables are called on every call (e.g. `(generate.ip, {'start': ..., 'end': ...})`),
+         so each call produces a fresh iterable. Any other value is returned as is.
+    """
+
+    if not isinstance(value_, str) and isinstance(value_, Sequence) \
+            and len(value_) == 2 and callable(value_[0]) and isinstance(value_[1], dict):
+        function, kwargs = value_
+        return lambda: function(**kwargs)
+
+    elif callable(value_):
+        return value_
+
+    else:
+        return lambda: value_
+
+
+def compile_timing(value_) -> Callable[[], float]:
+    """
+    Analyze a timing spec once & return a function that produces a period in seconds on every call.
+        Accepts:
+            None                - No delay
+            int, float          - Seconds
+            timedelta           - A timedelta object
+            str                 - A `parse.timedelta()` string. e.g. "from 10 seconds to 25 seconds"
+            Any other spec      - A random value spec producing one of the above
+    """
+
+    if value_ is None:
+        return lambda: 0.0
+
+    elif isinstance(value_, (int, float)):
+        seconds = float(value_)
+        return lambda: seconds
+
+    elif isinstance(value_, timedelta):
+        seconds = value_.total_seconds()
+        return lambda: seconds
+
+    elif isinstance(value_, str):
+        return lambda: parse.timedelta(value_).total_seconds()
+
+    else:
+        random_value = compile_random_value(value_)
+
+        def seconds_():
+            result = random_value()
+            if isinstance(result, timedelta):
+                return result.total_seconds()
+            elif isinstance(result, str):
+                return parse.timedelta(result).total_seconds()
+            return float(result)
+
+        return seconds_
+
+
+def compile_template(template: str) -> Callable[[dict], Any]:
+    """
+    Compile a field template string into a function that formats it with a given context dictionary.
+        A template of a single replacement field (e.g. "{victim}") produces the context value itself.
+        Literal braces must be doubled ("{{", "}}").
+    """
+    parsed = tuple(Formatter().parse(template))
+
+    if len(parsed) == 1:
+        literal_text, field_name, format_spec, conversion = parsed[0]
+        if field_name and not literal_text and not format_spec and not conversion \
+                and field_name.isidentifier():
+            return lambda context: context[field_name]
+
+    return lambda context: template.format_map(context)
+
+
+def is_template(value_) -> bool:
+    return isinstance(value_, str) and any(
+        field_name is not None for _, field_name, _, _ in Formatter().parse(value_)
+    )
+
+
+class ScenarioPhase:
+
+    KEYS = frozenset(('name', 'fields', 'foreach', 'count', 'wait', 'interval'))
+
+    def __init__(self, spec: dict, base_fields: dict):
+
+        unknown_keys = set(spec) - ScenarioPhase.KEYS
+        if unknown_keys:
+            raise ValueError(f"Unknown scenario phase keys: {', '.join(sorted(unknown_keys))}")
+
+        fields = dict(base_fields)
+        fields.update(spec.get('fields', {}))
+
+        self.name = spec.get('name')
+
+        self.fields = tuple(
+            (key, compile_random_value(value))
+            for key, value in fields.items() if not is_template(value)
+        )
+        self.templates = tuple(
+            (key, compile_template(value))
+            for key, value in fields.items() if is_template(value)
+        )
+        self.foreach = tuple(
+            (key, compile_iterable(value))
+            for key, value in spec.get('foreach', {}).items()
+        )
+
+        count = spec.get('count')
+        if count is None:
+            self.count = None if self.foreach else (lambda: 1)
+        else:
+            self.count = compile_random_value(count)
+
+        self.wait = compile_timing(spec.get('wait'))
+        self.interval = compile_timing(spec.get('interval'))
+
+
+class Scenario:
+    """
+    A compiled attack simulation scenario. See `compile_scenario()`.
+    """
+
+    KEYS = frozenset(('name', 'variables', 'fields', 'phases', 'repeat', 'interval'))
+
+    def __init__(self, spec: dict):
+
+        unknown_keys = set(spec) - Scenario.KEYS
+        if unknown_keys:
+            raise ValueError(f"Unknown scenario keys: {', '.join(sorted(unknown_keys))}")
+
+        phases = spec.get('phases')
+        if not phases:
+            raise ValueError("A scenario requires at least one phase.")
+
+        base_fields = spec.get('fields', {})
+
+        self.name = spec.get('name', 'Scenario')
+        self.variables = tuple(
+            (name, compile_random_value(value))
+            for name, value in spec.get('variables', {}).items()
+        )
+        self.phases = tuple(ScenarioPhase(phase, base_fields) for phase in phases)
+        self.repeat = compile_random_value(spec.get('repeat', 1))
+        self.interval = compile_timing(spec.get('interval'))
+
+    def timeline(self, offset: float = 0.0) -> Generator[Tuple[float, dict], None, None]:
+        """
+        Generates the scenario's events fields with their time offset in seconds, without waiting.
+        :param offset: Starting time offset in seconds.
+        :return: (offset, fields) tuples
+        """
+
+        for run in range(self.repeat()):
+
+            if run:
+                offset += self.interval()
+
+            context = {'scenario': self.name}
+            for name, value in self.variables:
+                context[name] = value()
+
+            for phase in self.phases:
+
+                offset += phase.wait()
+
+                phase_fields = phase.fields
+                phase_templates = phase.templates
+                phase_interval = phase.interval
+
+                count = phase.count() if phase.count is not None else -1
+                iterators = tuple((key, iter(iterable())) for key, iterable in phase.foreach)
+
+                index = 0
+                while index != count:
+
+                    fields = {key: value() for key, value in phase_fields}
+
+                    try:
+                        for key, iterator in iterators:
+                            fields[key] = next(iterator)
+                    except StopIteration:
+                        break
+
+                    for key, template in phase_templates:
+                        fields[key] = template(context)
+
+                    if index:
+                        offset += phase_interval()
+
+                    yield offset, fields
+                    index += 1
+
+
+def compile_scenario(spec: dict) -> Scenario:
+    """
+    Compile a declarative scenario into pre-resolved generators.
+        Random specs are analyzed once, so no type dispatch is done per event.
+
+    Scenario keys:
+        name        - Scenario name, available to templates as "{scenario}"
+        variables   - Random specs resolved once per scenario run, available to templates. e.g. "{attacker}"
+        fields      - Fields template shared by all phases
+        phases      - A list of phases, executed in order
+        repeat      - How many times to run the scenario (default: 1)
+        interval    - A timing spec to wait between runs
+
+    Phase keys:
+        name        - Optional phase name
+        fields      - Fields of the phase events. Overrides the scenario `fields`
+        foreach     - Fields that are iterated, producing an event per item until the shortest one is exhausted
+        count       - Amount of events to produce (default: 1, or unlimited when `foreach` is used)
+        wait        - A timing spec to wait before the phase starts
+        interval    - A timing spec to wait between the phase events
+
+    Field values are random specs in the same forms `process_random_value()` accepts.
+     Strings with replacement fields are templates, formatted with the scenario variables.
+     Timing specs are seconds, timedelta objects or `parse.timedelta()` strings.
+
+    e.g. The `fake_ip_scan()` simulation as a scenario:
+
+        compile_scenario({
+            'name': 'Fake IP Scan',
+            'variables': {
+                'attacker': (random.ip, {'from_address': '172.16.0.1', 'to_address': '172.16.0.254'}),
+                'victim': (random.ip, {'from_address': '192.168.0.1', 'to_address': '192.168.0.10'})
+            },
+            'fields': {
+                'name': 'Fake IP Scan Simulation',
+                'sourceAddress': '{attacker}'
+            },
+            'phases': [
+                {
+                    'fields': {'message': 'Fake Ping'},
+                    'foreach': {'destinationAddress': (generate.ip, {'start': '192.168.0.1', 'end': '192.168.0.10'})}
+                },
+                {
+                    'wait': 'from 10 seconds to 25 seconds',
+                    'fields': {
+                        'message': 'Fake Successful Telnet',
+                        'destinationPort': 23,
+                        'destinationAddress': '{victim}'
+                    }
+                }
+            ]
+        })
+
+    :param spec: Scenario dictionary
+    :return: A compiled Scenario
+    """
+    return Scenario(spec)
+
+
+def scenario(*scenarios, event: Cef = None, realtime: bool = True) -> Generator[Cef, None, None]:
+    """
+    Run one or more scenarios concurrently, interleaving their events into a single stream by their time offsets.
+
+    :param scenarios: Scenario dictionaries or compiled `Scenario` objects
+    :param event: Optional CEF event to work with. The CEF original state is kept protected.
+    :param realtime: Wait for the scenarios timing. If False, events are produced as fast as possible.
+    :return:
+    """
 
     if event is None:
         event = Cef()
 
-    for _ in range(amount):
+    queue = []
+
+    for index, scenario_ in enumerate(scenarios):
+
+        if not isinstance(scenario_, Scenario):
+            scenario_ = compile_scenario(scenario_)
+
+        timeline = scenario_.timeline()
+        for offset, fields in timeline:
+            heappush(queue, (offset, index, fields, timeline))
+            break
+
+    start_time = monotonic()
+
+    while queue:
+
+        offset, index, fields, timeline = heappop(queue)
+
+        if realtime:
+            delay = start_time + offset - monotonic()
+            if delay > 0:
+                sleep(seconds=delay)
 
         with event:
+            event.update(fields)
+            yield event
+
+        for offset, fields in timeline:
+            heappush(queue, (offset, index, fields, timeline))
+            break
+
 
-            for key, value in fields.items():
-                event[key] = process_random_value(value)
+class RandomFieldPlan:
+    """
+    A random fields spec, analyzed once into a plan of compiled functions (see `compile_random_value()`).
+
+        plan = RandomFieldPlan({'sourceAddress': random.ip, 'destinationPort': (random.port, {'to_port': 1024})})
+
+        plan()  # A dictionary of random field values
+    """
+
+    def __init__(self, fields: dict):
+        self.__keys = tuple(fields)
+        self.__plan = tuple((key, compile_random_value(value)) for key, value in fields.items())
+
+    def keys(self) -> tuple:
+        return self.__keys
+
+    def __call__(self) -> dict:
+        return {key: value() for key, value in self.__plan}
+
+
+# ToDo: Remember last time of event generation and use as `start_time` where now is `end_time`, for `random.time`
+def random_event(event=None, amount=1, **fields):
+    """
+    Simulate random events. Field values are random specs in the same forms `process_random_value()` accepts.
+        The fields spec is analyzed once into a `RandomFieldPlan`.
 
+    :param event: Optional CEF event to work with. The CEF original state is kept protected.
+    :param amount: Amount of events to produce
+    :param fields: Field names & their random specs
+    :return:
+    """
+
+    if event is None:
+        event = Cef()
+
+    plan = RandomFieldPlan(fields)
+
+    for _ in range(amount):
+        with event:
+            event.update(plan())
             yield event
+
+
+# Shard record: timestamp (double), payload length (unsigned int), followed by the payload bytes.
+SHARD_RECORD_HEADER = struct.Struct('<dI')
+
+
+def timestamp_key(value_) -> float:
+    if isinstance(value_, datetime):
+        return value_.timestamp()
+    elif isinstance(value_, (int, float)):
+        return float(value_)
+    elif isinstance(value_, str) and value_.isdigit():
+        return float(value_)
+    return 0.0
+
+
+def generate_shard(factory: Callable, amount: int, seed: int, timestamp_field: str = None, kwargs: dict = None) \
+        -> Tuple[str, int, int]:
+    """
+    A worker process task: generate & serialize a shard of events into a shared memory block.
+     The caller is responsible for unlinking the shared memory block.
+
+    :param factory: An events generator function, called as `factory(amount=amount, **kwargs)`
+    :param amount: Amount of events in the shard
+    :param seed: A random seed for this shard, so workers don't repeat each other's random values
+    :param timestamp_field: Optional field to sort the shard records by
+    :param kwargs: Keyword arguments for the factory
+    :return: Shared memory block name, used size & records count
+    """
+
+    from multiprocessing.shared_memory import SharedMemory  # Imported on use (`multiprocessing` is a heavy import)
+
+    builtin_random.seed(seed)
+
+    if kwargs is None:
+        kwargs = {}
+
+    records = []
+
+    for event in factory(amount=amount, **kwargs):
+
+        timestamp = 0.0
+        if timestamp_field is not None:
+            try:
+                timestamp = timestamp_key(event[timestamp_field])
+            except KeyError:
+                pass
+
+        records.append((timestamp, bytes(event)))
+
+    if timestamp_field is not None:
+        records.sort(key=lambda record: record[0])
+
+    header_size = SHARD_RECORD_HEADER.size
+    size = sum(header_size + len(payload) for _, payload in records)
+
+    shared_memory = SharedMemory(create=True, size=max(size, 1))
+    buffer = shared_memory.buf
+    position = 0
+
+    for timestamp, payload in records:
+        SHARD_RECORD_HEADER.pack_into(buffer, position, timestamp, len(payload))
+        position += header_size
+        buffer[position:position + len(payload)] = payload
+        position += len(payload)
+
+    del buffer
+    shared_memory.close()
+
+    return shared_memory.name, size, len(records)
+
+
+def read_shard(name: str, size: int) -> list:
+    """
+    Read the records of a shard generated by `generate_shard()` & release its shared memory block.
+    :return: A list of (timestamp, payload) tuples
+    """
+
+    from multiprocessing.shared_memory import SharedMemory  # Imported on use (`multiprocessing` is a heavy import)
+
+    shared_memory = SharedMemory(name=name)
+
+    try:
+        buffer = shared_memory.buf
+        header_size = SHARD_RECORD_HEADER.size
+        records = []
+        position = 0
+
+        while position < size:
+            timestamp, length = SHARD_RECORD_HEADER.unpack_from(buffer, position)
+            position += header_size
+            records.append((timestamp, bytes(buffer[position:position + length])))
+            position += length
+
+        del buffer
+
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+    return records
+
+
+def release_shard(name: str):
+    """
+    Unlink the shared memory block of a shard generated by `generate_shard()` that won't be read.
+    """
+
+    from multiprocessing.shared_memory import SharedMemory  # Imported on use (`multiprocessing` is a heavy import)
+
+    try:
+        shared_memory = SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+
+    shared_memory.close()
+    shared_memory.unlink()
+
+
+def parallel(
+        factory: Callable,
+        amount: int,
+        workers: int = None,
+        shard_size: int = 10_000,
+        timestamp_field: str = None,
+        outputs=None,
+        **kwargs
+) -> Generator[bytes, None, None]:
+    """
+    Generate serialized events in multiple processes.
+        Each worker process generates & serializes a shard of events into a shared memory block,
+         the calling process merges the shards & produces the serialized events.
+
+        e.g.
+            send.udp('127.0.0.1', 514, parallel(random_event, amount=1_000_000, sourceAddress=random.ip))
+
+        Notice: The factory & its keyword arguments are sent to the worker processes,
+         so they must be picklable (e.g. module level functions, not lambdas or generators).
+         On platforms that spawn worker processes, call this under an `if __name__ == '__main__':` guard.
+
+    :param factory: An events generator function, called as `factory(amount=shard_amount, **kwargs)`.
+                     e.g. `random_event`
+    :param amount: Total amount of events
+    :param workers: Amount of worker processes (default: CPU count). Also the maximum amount of shards in flight.
+    :param shard_size: Amount of events per shard
+    :param timestamp_field: Optional field to merge the events by, in timestamp order.
+                             Ordered merging waits for all shards to complete & holds all the records in memory
+                             (Any shard may hold the earliest event), `amount` bounds its memory.
+    :param outputs: An optional object, or collection of objects, that implement the write() method.
+                     Each event is written with a trailing CRLF, like `EventFormat.write()`.
+    :param kwargs: Keyword arguments for the factory. e.g. `random_event` fields
+    :return: Serialized events
+    """
+
+    # Imported on use (`concurrent.futures.process` & `multiprocessing` are heavy imports).
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures import FIRST_COMPLETED
+    from concurrent.futures import wait
+    from multiprocessing import resource_tracker
+
+    if outputs is not None and not isinstance(outputs, (list, tuple, set)):
+        outputs = (outputs,)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    shards = []
+    while amount > 0:
+        shards.append(min(shard_size, amount))
+        amount -= shard_size
+
+    shards = iter(shards)
+
+    def write(payloads):
+        for payload in payloads:
+            if outputs:
+                line = payload + b'\r\n'
+                for output in outputs:
+                    output.write(line)
+            yield payload
+
+    # Worker processes share the tracker of this process, which sees both the creation & the unlinking of the shards.
+    resource_tracker.ensure_running()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        # Submitted shards that were not read yet, in submission order.
+        futures = []
+
+        def submit(count):
+            for shard_amount in islice(shards, count):
+                futures.append(
+                    executor.submit(
+                        generate_shard,
+                        factory,
+                        shard_amount,
+                        int.from_bytes(os.urandom(8), 'big'),
+                        timestamp_field,
+                        kwargs
+                    )
+                )
+
+        try:
+
+            submit(workers)
+
+            if timestamp_field is None:
+
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        name, size, _ = future.result()
+                        futures.remove(future)
+                        submit(1)
+                        yield from write(payload for _, payload in read_shard(name, size))
+
+            else:
+
+                shard_records = []
+
+                while futures:
+                    name, size, _ = futures[0].result()
+                    futures.pop(0)
+                    submit(1)
+                    shard_records.append(read_shard(name, size))
+
+                yield from write(
+                    payload for _, payload in merge(*shard_records, key=lambda record: record[0])
+                )
+
+        finally:
+
+            # Closed early (or failed): release the shards that were generated but not read.
+            for future in futures:
+                future.cancel()
+
+            for future in futures:
+                if future.cancelled():
+                    continue
+                try:
+                    name, _, _ = future.result()
+                except Exception:
+                    continue
+                release_shard(name)
@@ -0,0 +1,107 @@
+#   Copyright (C) 2020 CyberSIEM(R)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import unittest
+
+from siemkit.adaptors import HttpResponse
+from siemkit.arcsight import normalized_active_list_entries
+
+
+class ChunkedResponse(HttpResponse):
+
+    def __init__(self, body: str, chunk_size: int = 7):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.read = 0
+        self.closed = False
+
+    def json(self) -> dict:
+        return json.loads(self.body)
+
+    def status_code(self) -> int:
+        return 200
+
+    def text(self) -> str:
+        return self.body
+
+    def headers(self) -> dict:
+        return {}
+
+    def cookies(self) -> dict:
+        return {}
+
+    def iter_text(self, chunk_size: int = 65_536):
+        for start in range(0, len(self.body), self.chunk_size):
+            self.read = start + self.chunk_size
+            yield self.body[start:start + self.chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class TestStreamedActiveListEntries(unittest.TestCase):
+
+    columns = ['user', 'group']
+    values = [['alice', 'admins'], ['bob', 'users'], ['carol', 'users']]
+
+    def response(self, *members) -> ChunkedResponse:
+        body = {'act.getEntriesResponse': {'act.return': dict(members)}}
+        return ChunkedResponse(json.dumps(body))
+
+    def expected(self, values) -> list:
+        return [dict(zip(self.columns, entry), _columns_order=self.columns) for entry in values]
+
+    def test_columns_first(self):
+        response = self.response(
+            ('columns', self.columns),
+            ('entryList', [{'entry': entry} for entry in self.values])
+        )
+        entries = normalized_active_list_entries(response, stream=True)
+
+        # Yielded as decoded, before the rest of the response is read.
+        self.assertEqual(next(entries), self.expected(self.values)[0])
+        self.assertLess(response.read, len(response.body))
+
+        self.assertEqual(list(entries), self.expected(self.values)[1:])
+        self.assertTrue(response.closed)
+
+    def test_entries_first(self):
+        # The entries are held until the columns are decoded.
+        response = self.response(
+            ('entryList', [{'entry': entry} for entry in self.values]),
+            ('columns', self.columns)
+        )
+        self.assertEqual(list(normalized_active_list_entries(response, stream=True)), self.expected(self.values))
+        self.assertTrue(response.closed)
+
+    def test_single_entry(self):
+        for members in (
+                (('columns', self.columns), ('entryList', {'entry': self.values[0]})),
+                (('entryList', {'entry': self.values[0]}), ('columns', self.columns))
+        ):
+            with self.subTest(members=members):
+                response = self.response(*members)
+                self.assertEqual(
+                    list(normalized_active_list_entries(response, stream=True)),
+                    self.expected(self.values[:1])
+                )
+
+    def test_no_entries(self):
+        response = self.response(('columns', self.columns))
+        self.assertEqual(list(normalized_active_list_entries(response, stream=True)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
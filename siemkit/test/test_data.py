@@ -0,0 +1,80 @@
+#   Copyright (C) 2020 CyberSIEM(R)
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+
+from siemkit.data import JsonStream
+
+
+class TestJsonStream(unittest.TestCase):
+
+    path = ('response', 'entryList')
+
+    payload = (
+        '{"response": {"columns": ["a", "b"], "count": -12, "ratio": 2.5e10, '
+        '"entryList": [3.25, 4, -0.5E+3, 1e-2, true, null, "x,]\\"y", {"n": [1.5, -7]}, [], {}]}, '
+        '"total": 1234567}'
+    )
+
+    expected = [
+        (('response', 'columns'), ['a', 'b']),
+        (('response', 'count'), -12),
+        (('response', 'ratio'), 2.5e10),
+        (path, 3.25),
+        (path, 4),
+        (path, -0.5E+3),
+        (path, 1e-2),
+        (path, True),
+        (path, None),
+        (path, 'x,]"y'),
+        (path, {'n': [1.5, -7]}),
+        (path, []),
+        (path, {}),
+        (('total',), 1234567)
+    ]
+
+    def test_chunks(self):
+        # Split at every offset, e.g. a number after its '.' or exponent ('3.' + '25', '2.5e' + '10').
+        for offset in range(len(self.payload) + 1):
+            chunks = [self.payload[:offset], self.payload[offset:]]
+            with self.subTest(offset=offset):
+                stream = JsonStream(chunks, self.path)
+                self.assertEqual(list(stream), self.expected)
+                self.assertTrue(stream.found)
+
+    def test_characters(self):
+        stream = JsonStream(iter(self.payload), self.path)
+        self.assertEqual(list(stream), self.expected)
+
+    def test_numbers(self):
+        # The path () yields the items of a top level array, or the top level value.
+        for chunks, expected in (
+                (['[3.', '25, 4]'], [3.25, 4]),
+                (['{"z": 2.5e', '10}'], [{'z': 2.5e10}]),
+                (['[1.5E', '+3]'], [1.5E+3]),
+                (['[1', '2', '3]'], [123]),
+                (['12', '3'], [123])
+        ):
+            with self.subTest(chunks=chunks):
+                self.assertEqual([value for _, value in JsonStream(chunks)], expected)
+
+    def test_invalid(self):
+        for chunks in (['[1,', ' 2'], ['{"a": 1} 2'], ['[1.', 'x]']):
+            with self.subTest(chunks=chunks):
+                with self.assertRaises(ValueError):
+                    list(JsonStream(chunks, ('a',) if chunks[0].startswith('{') else ()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -24,7 +24,8 @@ from math import floor
 from enum import Enum
 from abc import ABC
 from abc import abstractmethod
-from inspect import isclass
+from typing import Iterable
+from typing import List
 from typing import Union
 import time
 
@@ -47,6 +48,43 @@ def pick_timedelta(timedelta_, *args, **kwargs) -> timedelta:
     return given_timedelta
 
 
+def is_datetime64(values) -> bool:
+    """
+    Checks whether the values are a NumPy `datetime64` array, without importing NumPy.
+    """
+    dtype = getattr(values, 'dtype', None)
+    return dtype is not None and dtype.kind == 'M'
+
+
+def as_list(values) -> list:
+    """
+    Turns NumPy arrays into lists of Python objects (Faster to iterate), and other iterables into lists.
+    """
+    if hasattr(values, 'tolist'):
+        return values.tolist()
+    if isinstance(values, list):
+        return values
+    return list(values)
+
+
+def posix_timestamps(datetimes: Iterable[datetime]) -> List[float]:
+    """
+    POSIX timestamps of datetime objects, same as `datetime_.astimezone(tz=tz).timestamp()`
+     (Naive datetimes are local time) without converting each datetime to a timezone.
+    """
+    fromtimestamp = datetime.fromtimestamp
+    timestamps = []
+    for datetime_ in datetimes:
+        timestamp = datetime_.timestamp()
+        if datetime_.tzinfo is None:
+            local = fromtimestamp(timestamp)
+            if local.minute != datetime_.minute or local.hour != datetime_.hour or local.day != datetime_.day:
+                # A nonexistent local time (DST gap), `astimezone()` resolves it differently.
+                timestamp = datetime_.astimezone().timestamp()
+        timestamps.append(timestamp)
+    return timestamps
+
+
 class Timestamp(ABC):
     """
     An interface for implementing a proper Timestamp.
@@ -77,6 +115,62 @@ class Timestamp(ABC):
         """
         raise NotImplementedError("'to_datetime()' method must be implemented.")
 
+    @classmethod
+    def from_datetimes(cls, datetimes: Iterable[datetime], tz: tzinfo = None) -> List[Union[int, str]]:
+        """
+        Convert many datetime objects into timestamps of this time type.
+            A NumPy `datetime64` array is converted with `from_datetime64()`.
+        :param datetimes:
+        :param tz: Timezone to convert to. Default is None.
+        :return:
+        """
+        if is_datetime64(datetimes):
+            return cls.from_datetime64(datetimes)
+
+        from_datetime = cls.from_datetime
+        return [from_datetime(datetime_, tz) for datetime_ in datetimes]
+
+    @classmethod
+    def to_datetimes(cls, timestamps: Iterable[Union[int, str]], tz: tzinfo = None) -> List[datetime]:
+        """
+        Convert many timestamps of this time type into datetime objects.
+        :param timestamps: Timestamps or a NumPy array of timestamps
+        :param tz: Timezone of the the timestamps to let the datetimes know their timezone.
+        :return:
+        """
+        to_datetime = cls.to_datetime
+        return [to_datetime(timestamp, tz) for timestamp in as_list(timestamps)]
+
+    @classmethod
+    def from_datetime64(cls, array):
+        """
+        Convert a NumPy `datetime64` array (UTC) into a NumPy array of timestamps of this time type.
+        :param array:
+        :return:
+        """
+        import numpy
+
+        datetimes = [
+            datetime_.replace(tzinfo=UTC)
+            for datetime_ in numpy.asarray(array).astype('datetime64[us]').astype(datetime).tolist()
+        ]
+        return numpy.array(cls.from_datetimes(datetimes))
+
+    @classmethod
+    def to_datetime64(cls, timestamps):
+        """
+        Convert timestamps of this time type into a NumPy `datetime64` array (UTC).
+        :param timestamps: Timestamps or a NumPy array of timestamps
+        :return:
+        """
+        import numpy
+
+        datetimes = cls.to_datetimes(timestamps, tz=UTC)
+        return numpy.array(
+            [datetime_.astimezone(tz=UTC).replace(tzinfo=None) for datetime_ in datetimes],
+            dtype='datetime64[us]'
+        )
+
     @classmethod
     def delta(cls, timedelta_: timedelta = None, *args, **kwargs) -> int:
         """
@@ -111,6 +205,31 @@ class EpochTimestamp(Timestamp):
     def to_datetime(cls, timestamp: int, tz: tzinfo = None) -> datetime:
         return datetime.fromtimestamp(timestamp).replace(tzinfo=tz)
 
+    @classmethod
+    def from_datetimes(cls, datetimes: Iterable[datetime], tz: tzinfo = None) -> List[int]:
+        if is_datetime64(datetimes):
+            return cls.from_datetime64(datetimes)
+
+        return [floor(timestamp) for timestamp in posix_timestamps(datetimes)]
+
+    @classmethod
+    def to_datetimes(cls, timestamps: Iterable[int], tz: tzinfo = None) -> List[datetime]:
+        fromtimestamp = datetime.fromtimestamp
+        datetimes = [fromtimestamp(timestamp) for timestamp in as_list(timestamps)]
+        if tz is not None:
+            datetimes = [datetime_.replace(tzinfo=tz) for datetime_ in datetimes]
+        return datetimes
+
+    @classmethod
+    def from_datetime64(cls, array):
+        import numpy
+        return numpy.asarray(array).astype('datetime64[s]').astype('int64')
+
+    @classmethod
+    def to_datetime64(cls, timestamps):
+        import numpy
+        return numpy.asarray(timestamps, dtype='int64').astype('datetime64[s]')
+
 
 class EpochMillisTimestamp(Timestamp):
 
@@ -124,6 +243,33 @@ class EpochMillisTimestamp(Timestamp):
     def to_datetime(cls, timestamp: int, tz: tzinfo = None) -> datetime:
         return datetime.fromtimestamp(int(timestamp) / cls.PRECISION).replace(tzinfo=tz)
 
+    @classmethod
+    def from_datetimes(cls, datetimes: Iterable[datetime], tz: tzinfo = None) -> List[int]:
+        if is_datetime64(datetimes):
+            return cls.from_datetime64(datetimes)
+
+        precision = cls.PRECISION
+        return [floor(timestamp * precision) for timestamp in posix_timestamps(datetimes)]
+
+    @classmethod
+    def to_datetimes(cls, timestamps: Iterable[int], tz: tzinfo = None) -> List[datetime]:
+        fromtimestamp = datetime.fromtimestamp
+        precision = cls.PRECISION
+        datetimes = [fromtimestamp(int(timestamp) / precision) for timestamp in as_list(timestamps)]
+        if tz is not None:
+            datetimes = [datetime_.replace(tzinfo=tz) for datetime_ in datetimes]
+        return datetimes
+
+    @classmethod
+    def from_datetime64(cls, array):
+        import numpy
+        return numpy.asarray(array).astype('datetime64[ms]').astype('int64')
+
+    @classmethod
+    def to_datetime64(cls, timestamps):
+        import numpy
+        return numpy.asarray(timestamps, dtype='int64').astype('datetime64[ms]')
+
 
 class FiletimeTimestamp(Timestamp):
     """
@@ -157,6 +303,46 @@ class FiletimeTimestamp(Timestamp):
 
         return epoch_datetime.replace(tzinfo=tz)
 
+    @classmethod
+    def from_datetimes(cls, datetimes: Iterable[datetime], tz: tzinfo = None) -> List[int]:
+        if is_datetime64(datetimes):
+            return cls.from_datetime64(datetimes)
+
+        precision = cls.PRECISION
+        epoch_start_time = cls.EPOCH_START_TIME
+        return [floor((timestamp * precision) + epoch_start_time) for timestamp in posix_timestamps(datetimes)]
+
+    @classmethod
+    def to_datetimes(cls, timestamps: Iterable[int], tz: tzinfo = None) -> List[datetime]:
+        fromtimestamp = datetime.fromtimestamp
+        to_datetime = cls.to_datetime
+        precision = cls.PRECISION
+        epoch_start_seconds = cls.EPOCH_START_TIME // precision
+
+        datetimes = []
+        for timestamp in as_list(timestamps):
+            # Local time straight from epoch seconds, rounded to microseconds the same as `to_datetime()`.
+            delta_ = timedelta(seconds=(timestamp / precision))
+            try:
+                datetime_ = fromtimestamp(
+                    delta_.days * 86_400 + delta_.seconds - epoch_start_seconds
+                ).replace(microsecond=delta_.microseconds, tzinfo=tz)
+            except (OverflowError, OSError, ValueError):
+                datetime_ = to_datetime(timestamp, tz)
+            datetimes.append(datetime_)
+        return datetimes
+
+    @classmethod
+    def from_datetime64(cls, array):
+        import numpy
+        # 100 nanosecond intervals since 1601-01-01.
+        return numpy.asarray(array).astype('datetime64[us]').astype('int64') * 10 + cls.EPOCH_START_TIME
+
+    @classmethod
+    def to_datetime64(cls, timestamps):
+        import numpy
+        return ((numpy.asarray(timestamps, dtype='int64') - cls.EPOCH_START_TIME) // 10).astype('datetime64[us]')
+
 
 class LdapTimestamp(Timestamp):
 
@@ -184,6 +370,54 @@ class LdapTimestamp(Timestamp):
                 .astimezone(tz=tz)
         )
 
+    @classmethod
+    def from_datetimes(cls, datetimes: Iterable[datetime], tz: tzinfo = None) -> List[str]:
+        if is_datetime64(datetimes):
+            return cls.from_datetime64(datetimes)
+
+        datetimes = [datetime_.replace(tzinfo=tz).astimezone(tz=timezone.utc) for datetime_ in datetimes]
+        return [
+            f"{datetime_.year:04}{datetime_.month:02}{datetime_.day:02}"
+            f"{datetime_.hour:02}{datetime_.minute:02}{datetime_.second:02}.0Z"
+            for datetime_ in datetimes
+        ]
+
+    @classmethod
+    def to_datetimes(cls, timestamps: Iterable[str], tz: tzinfo = None) -> List[datetime]:
+        to_datetime = cls.to_datetime
+        datetimes = []
+        for timestamp in as_list(timestamps):
+            # Slicing the fixed width 'YYYYmmddHHMMSS.0Z' format, instead of `strptime()`.
+            if len(timestamp) == 17 and timestamp[14:] == '.0Z' and timestamp[:14].isdigit():
+                datetimes.append(
+                    datetime(
+                        int(timestamp[:4]), int(timestamp[4:6]), int(timestamp[6:8]),
+                        int(timestamp[8:10]), int(timestamp[10:12]), int(timestamp[12:14]),
+                        tzinfo=UTC
+                    ).astimezone(tz=tz)
+                )
+            else:
+                datetimes.append(to_datetime(timestamp, tz))
+        return datetimes
+
+    @classmethod
+    def from_datetime64(cls, array):
+        import numpy
+        strings = numpy.datetime_as_string(numpy.asarray(array).astype('datetime64[s]'), unit='s')
+        return numpy.array([
+            f"{string[:4]}{string[5:7]}{string[8:10]}{string[11:13]}{string[14:16]}{string[17:19]}.0Z"
+            for string in strings.tolist()
+        ])
+
+    @classmethod
+    def to_datetime64(cls, timestamps):
+        import numpy
+        return numpy.array([
+            f"{timestamp[:4]}-{timestamp[4:6]}-{timestamp[6:8]}T"
+            f"{timestamp[8:10]}:{timestamp[10:12]}:{timestamp[12:14]}"
+            for timestamp in as_list(timestamps)
+        ], dtype='datetime64[s]')
+
 
 class TimeType(Enum):
 
@@ -192,6 +426,18 @@ class TimeType(Enum):
     FILETIME = FiletimeTimestamp
     LDAP = LdapTimestamp
 
+    def from_datetimes(self, datetimes: Iterable[datetime], tz: tzinfo = None) -> list:
+        return self.value.from_datetimes(datetimes, tz)
+
+    def to_datetimes(self, timestamps: Iterable[Union[int, str]], tz: tzinfo = None) -> List[datetime]:
+        return self.value.to_datetimes(timestamps, tz)
+
+    def from_datetime64(self, array):
+        return self.value.from_datetime64(array)
+
+    def to_datetime64(self, timestamps):
+        return self.value.to_datetime64(timestamps)
+
 
 default = {
     'format': "%b %d %Y %H:%M:%S",
@@ -211,7 +457,7 @@ def time_type(time_type_enum: TimeType) -> Timestamp:
     if isinstance(time_type_enum, Timestamp):
         return time_type_enum
 
-    if time_type_enum is None or not (isclass(time_type_enum.value)
+    if time_type_enum is None or not (isinstance(time_type_enum.value, type)
                                       and issubclass(time_type_enum.value, Timestamp)):
         time_type_class = default.get('type', TimeType.EPOCH_MILLIS).value
     else:
@@ -271,6 +517,14 @@ def from_timestamp(timestamp: int, tz=None, type_: TimeType = None) -> datetime:
     return time_type(type_).to_datetime(timestamp, tz)
 
 
+def to_timestamps(datetimes: Iterable[datetime], tz=None, type_: TimeType = None) -> list:
+    return time_type(type_).from_datetimes(datetimes, tz)
+
+
+def from_timestamps(timestamps: Iterable[Union[int, str]], tz=None, type_: TimeType = None) -> List[datetime]:
+    return time_type(type_).to_datetimes(timestamps, tz)
+
+
 def to_format(datetime_: datetime = None, format_: str = None, tz: tzinfo = None) -> str:
     """
     Convert a datetime object to a default or given time format.